@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from firebase_config import db
+from batch_writer import BatchWriter
+from dates import DUE_DATE_FORMAT, normalize_due_date, parse_range_bound
+from fanout import run_parallel
+
+agenda_routes = Blueprint('agenda', __name__)
+
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 366
+# Per collection; a window holding more than this is reported as truncated
+MAX_AGENDA_ITEMS = 500
+
+# Tasks or subtasks assigned to user_id with from_date <= dueDate < to_date.
+# Needs a composite index on assignedTo + dueDate in each collection.
+def _due_between(collection, user_id, from_date, to_date):
+    query = (db.collection(collection)
+             .where('assignedTo', '==', user_id)
+             .where('dueDate', '>=', from_date)
+             .where('dueDate', '<', to_date)
+             .order_by('dueDate')
+             .limit(MAX_AGENDA_ITEMS + 1))
+    return [doc.to_dict() for doc in query.stream()]
+
+@agenda_routes.route('/agenda', methods=['GET'])
+def get_agenda():
+    try:
+        user_id = request.args.get('userID')
+        if not user_id:
+            return jsonify({'error': 'userID is required'}), 400
+
+        try:
+            if request.args.get('from'):
+                from_date = parse_range_bound(request.args['from'])
+            else:
+                from_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).strftime(DUE_DATE_FORMAT)
+            if request.args.get('to'):
+                to_date = parse_range_bound(request.args['to'], upper=True)
+            else:
+                to_date = (datetime.strptime(from_date, DUE_DATE_FORMAT)
+                           + timedelta(days=DEFAULT_WINDOW_DAYS)).strftime(DUE_DATE_FORMAT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        window = datetime.strptime(to_date, DUE_DATE_FORMAT) - datetime.strptime(from_date, DUE_DATE_FORMAT)
+        if window <= timedelta(0):
+            return jsonify({'error': 'to must be after from'}), 400
+        if window > timedelta(days=MAX_WINDOW_DAYS):
+            return jsonify({'error': f'The window can span at most {MAX_WINDOW_DAYS} days'}), 400
+
+        # One range query per collection, run concurrently
+        tasks, subtasks = run_parallel(
+            lambda: _due_between('Tasks', user_id, from_date, to_date),
+            lambda: _due_between('Subtasks', user_id, from_date, to_date)
+        )
+        truncated = len(tasks) > MAX_AGENDA_ITEMS or len(subtasks) > MAX_AGENDA_ITEMS
+
+        items = [{**task, 'type': 'task'} for task in tasks[:MAX_AGENDA_ITEMS]]
+        items += [{**subtask, 'type': 'subtask'} for subtask in subtasks[:MAX_AGENDA_ITEMS]]
+        items.sort(key=lambda item: item['dueDate'])
+
+        return jsonify({
+            'userID': user_id,
+            'from': from_date,
+            'to': to_date,
+            'items': items,
+            'truncated': truncated
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Rewrite dueDate on tasks and subtasks (and project deadlines) stored before
+# dates were normalized, or in the earlier zone-less format, so they show up
+# in agenda and reminder range queries. Unparseable dates are left as they are. Returns (updated, unparseable).
+def normalize_due_dates():
+    updated = 0
+    unparseable = 0
+    with BatchWriter(db) as writer:
+        for collection, field in (('Tasks', 'dueDate'), ('Subtasks', 'dueDate'), ('Project', 'deadline')):
+            for doc in db.collection(collection).select([field]).stream():
+                due_date = doc.to_dict().get(field)
+                try:
+                    normalized = normalize_due_date(due_date)
+                except ValueError:
+                    unparseable += 1
+                    continue
+                if normalized != due_date:
+                    writer.update(doc.reference, {field: normalized})
+                    updated += 1
+    return updated, unparseable
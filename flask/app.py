@@ -1,28 +1,72 @@
-from flask import Flask, jsonify, request
+import os
+from flask import Flask, jsonify
 from flask_cors import CORS
-from firebase_config import initialize_firebase
 from task import task_routes
 from project import project_routes
 from signup import signup_routes
 from login import login_routes
 from subtask import subtask_routes
 from comment import comment_routes
+from board import board_routes
+from sync import sync_routes
+from realtime import realtime_routes
+from cascade import cascade_routes
+from bulk import bulk_routes
+from search import search_routes
+from agenda import agenda_routes
+from notifications import notification_routes
+from project_stats import project_stats_routes
+from lifecycle import lifecycle_routes, mark_ready
+from metrics import init_metrics
+from auth_middleware import init_auth
 
-app = Flask(__name__)
-CORS(app)
-db, _ = initialize_firebase()
+# Settings read from the environment; see gunicorn.conf.py for the bind
+# address and the worker and thread counts used in production
+def load_config():
+    return {
+        'HOST': os.getenv('HOST', '127.0.0.1'),
+        'PORT': int(os.getenv('PORT', '3000')),
+        'DEBUG': os.getenv('FLASK_DEBUG', '0') in ('1', 'true', 'yes'),
+        'CORS_ORIGINS': os.getenv('CORS_ORIGINS', '*')
+    }
 
-# Register blueprints
-app.register_blueprint(signup_routes)
-app.register_blueprint(login_routes)
-app.register_blueprint(project_routes)
-app.register_blueprint(task_routes)
-app.register_blueprint(subtask_routes)
-app.register_blueprint(comment_routes)
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(load_config())
+    app.config.update(config or {})
 
-@app.route('/')
-def home():
-    return jsonify({"message": "Flask with Firebase is working!"})
+    CORS(app, origins=app.config['CORS_ORIGINS'])
+    init_metrics(app)
+    init_auth(app)
 
+    # Register blueprints
+    app.register_blueprint(lifecycle_routes)
+    app.register_blueprint(signup_routes)
+    app.register_blueprint(login_routes)
+    app.register_blueprint(project_routes)
+    app.register_blueprint(task_routes)
+    app.register_blueprint(subtask_routes)
+    app.register_blueprint(comment_routes)
+    app.register_blueprint(board_routes)
+    app.register_blueprint(sync_routes)
+    app.register_blueprint(realtime_routes)
+    app.register_blueprint(cascade_routes)
+    app.register_blueprint(bulk_routes)
+    app.register_blueprint(search_routes)
+    app.register_blueprint(agenda_routes)
+    app.register_blueprint(notification_routes)
+    app.register_blueprint(project_stats_routes)
+
+    @app.route('/')
+    def home():
+        return jsonify({"message": "Flask with Firebase is working!"})
+
+    return app
+
+app = create_app()
+
+# Development server, on localhost with the debugger off unless HOST and
+# FLASK_DEBUG say otherwise; production runs `gunicorn -c gunicorn.conf.py app:app`
 if __name__ == '__main__':
-    app.run(host = '192.168.0.107', port=3000, debug=True)
\ No newline at end of file
+    mark_ready()
+    app.run(host=app.config['HOST'], port=app.config['PORT'], debug=app.config['DEBUG'], threaded=True)
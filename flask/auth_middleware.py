@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import threading
+import time
+from flask import g, jsonify, request
+from http_pool import get as http_get
+
+# Firebase ID tokens are RS256 JWTs signed with Google's rotating securetoken
+# keys, published as X.509 certificates with a Cache-Control max-age
+SIGNING_KEYS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+# 'optional' (default): a valid Bearer token sets g.uid, an invalid one is
+# rejected, and requests without one pass through as before.
+# 'required': every non-public endpoint needs a valid token. 'off': skip.
+# Public endpoints never look at the token, so a client holding an expired
+# one can still log in and probes that send a header still pass.
+AUTH_MODE = os.getenv('AUTH_MODE', 'optional')
+CLOCK_SKEW_SECONDS = int(os.getenv('AUTH_CLOCK_SKEW', '60'))
+# Unknown key IDs trigger an early refresh, but at most this often
+MIN_REFRESH_SECONDS = 60
+
+PUBLIC_ENDPOINTS = {'home', 'login.login', 'signup.signup', 'lifecycle.healthz', 'lifecycle.readyz',
+                    'metrics.metrics'}
+
+class AuthError(Exception):
+    pass
+
+# Public keys by key ID, refetched when the published max-age runs out or a
+# token names a key we haven't seen (i.e. after a rotation)
+class SigningKeyCache:
+    def __init__(self, url=SIGNING_KEYS_URL):
+        self.url = url
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, key_id):
+        now = time.time()
+        if now >= self._expires_at or (key_id not in self._keys and now - self._fetched_at >= MIN_REFRESH_SECONDS):
+            with self._lock:
+                if now >= self._expires_at or (key_id not in self._keys and
+                                               now - self._fetched_at >= MIN_REFRESH_SECONDS):
+                    self._refresh()
+        return self._keys.get(key_id)
+
+    def _refresh(self):
+        from cryptography.x509 import load_pem_x509_certificate
+
+        response = http_get(self.url)
+        response.raise_for_status()
+        self._keys = {
+            key_id: load_pem_x509_certificate(pem.encode()).public_key()
+            for key_id, pem in response.json().items()
+        }
+        max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        self._fetched_at = time.time()
+        self._expires_at = self._fetched_at + (int(max_age.group(1)) if max_age else 3600)
+
+signing_keys = SigningKeyCache()
+
+_project_id = None
+
+def _firebase_project_id():
+    global _project_id
+    if _project_id is None:
+        _project_id = os.getenv('FIREBASE_PROJECT_ID') or os.getenv('GOOGLE_CLOUD_PROJECT')
+        if not _project_id:
+            with open('firebase_config.json') as config_file:
+                _project_id = json.load(config_file)['project_id']
+    return _project_id
+
+# Check a Firebase ID token's signature and claims without calling Firebase.
+# Returns the decoded claims; the caller's uid is claims['sub'].
+def verify_id_token(token):
+    import jwt
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        raise AuthError('Malformed token')
+    if header.get('alg') != 'RS256':
+        raise AuthError('Unexpected token algorithm')
+
+    key = signing_keys.get(header.get('kid'))
+    if key is None:
+        raise AuthError('Unknown token signing key')
+
+    project_id = _firebase_project_id()
+    try:
+        claims = jwt.decode(token, key=key, algorithms=['RS256'], audience=project_id,
+                            issuer=f'https://securetoken.google.com/{project_id}', leeway=CLOCK_SKEW_SECONDS,
+                            options={'require': ['exp', 'iat', 'sub', 'aud', 'iss']})
+    except jwt.ExpiredSignatureError:
+        raise AuthError('Token expired')
+    except jwt.InvalidTokenError as e:
+        raise AuthError(f'Invalid token: {e}')
+
+    if not claims['sub'] or claims.get('auth_time', 0) > time.time() + CLOCK_SKEW_SECONDS:
+        raise AuthError('Invalid token subject')
+    return claims
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    if header[:7].lower() == 'bearer ':
+        return header[7:].strip() or None
+    return None
+
+def _authenticate():
+    g.uid = None
+    g.token_claims = None
+    if request.method == 'OPTIONS' or request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+
+    token = _bearer_token()
+    if token is None:
+        if AUTH_MODE == 'required':
+            return jsonify({'error': 'Authentication required'}), 401
+        return None
+
+    try:
+        claims = verify_id_token(token)
+    except AuthError as e:
+        return jsonify({'error': str(e)}), 401
+    except Exception as e:
+        # e.g. the signing keys couldn't be fetched
+        return jsonify({'error': f'Could not verify token: {e}'}), 503
+    g.uid = claims['sub']
+    g.token_claims = claims
+    return None
+
+# The authenticated caller's uid, or None
+def current_uid():
+    return g.get('uid')
+
+# The caller's User document (served from user_cache once warm), or None
+def current_user():
+    from user_hydration import get_user
+
+    uid = current_uid()
+    return get_user(uid) if uid else None
+
+def init_auth(app):
+    if AUTH_MODE != 'off':
+        app.before_request(_authenticate)
@@ -0,0 +1,51 @@
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_OPERATIONS = 500
+
+# Accumulates writes into WriteBatch commits of at most max_operations each.
+# Use as a context manager; pending writes are committed on a clean exit.
+class BatchWriter:
+    def __init__(self, db, max_operations=MAX_BATCH_OPERATIONS):
+        self.db = db
+        self.max_operations = max_operations
+        self.committed = 0
+        self._batch = db.batch()
+        self._pending = 0
+
+    def set(self, ref, data, merge=False):
+        self._batch.set(ref, data, merge=merge)
+        self._added()
+
+    # option: a write precondition, e.g. storage.unchanged_since(snapshot)
+    def update(self, ref, data, option=None):
+        self._batch.update(ref, data, option=option)
+        self._added()
+
+    def delete(self, ref, option=None):
+        self._batch.delete(ref, option=option)
+        self._added()
+
+    # Commit what is pending first unless n more writes fit, so the next n
+    # writes land in the same commit
+    def reserve(self, n):
+        if self._pending + n > self.max_operations:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._batch.commit()
+            self.committed += self._pending
+            self._batch = self.db.batch()
+            self._pending = 0
+
+    def _added(self):
+        self._pending += 1
+        if self._pending >= self.max_operations:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
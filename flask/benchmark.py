@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Endpoint benchmarks against the local storage engine, e.g.
+#   python benchmark.py --scale medium --concurrency 8 --output bench.json
+#   python benchmark.py --baseline bench.json --max-regression 0.25
+# The app is imported after the backend is forced to an in-memory SQLite
+# store, so no Firebase project is touched.
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = ':memory:'
+os.environ.setdefault('REQUEST_LOGS', '0')
+
+SCALES = {
+    'small': {'users': 20, 'projects': 5, 'tasks': 20, 'subtasks': 2, 'comments': 3},
+    'medium': {'users': 200, 'projects': 40, 'tasks': 100, 'subtasks': 3, 'comments': 5},
+    'large': {'users': 1000, 'projects': 200, 'tasks': 200, 'subtasks': 4, 'comments': 10},
+}
+
+STATUSES = ['To Do', 'In Progress', 'Done']
+PRIORITIES = ['Low', 'Medium', 'High']
+
+def seed(db, scale, rng):
+    from batch_writer import BatchWriter
+    from dates import normalize_due_date
+
+    now = datetime.utcnow()
+    users, projects, tasks = [], [], []
+
+    with BatchWriter(db) as writer:
+        for index in range(scale['users']):
+            user_id = uuid.UUID(int=rng.getrandbits(128)).hex
+            users.append(user_id)
+            writer.set(db.collection('User').document(user_id), {
+                'userID': user_id,
+                'name': f'user{index}',
+                'nameKey': f'user{index}',
+                'email': f'user{index}@bench.local',
+                'role': 'student',
+                'avatar': f'https://robohash.org/{user_id[:8]}',
+                'projects': [],
+                'createdAt': now.isoformat()
+            })
+
+        memberships = {user_id: [] for user_id in users}
+        for index in range(scale['projects']):
+            project_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            members = rng.sample(users, min(len(users), rng.randint(2, 8)))
+            projects.append((project_id, members))
+            for member_id in members:
+                memberships[member_id].append(project_id)
+            writer.set(db.collection('Project').document(project_id), {
+                'projectID': project_id,
+                'title': f'Project {index}',
+                'description': 'Benchmark project',
+                'ownerID': members[0],
+                'members': members,
+                'deadline': (now + timedelta(days=rng.randint(1, 90))).isoformat(),
+                'createdAt': now.isoformat()
+            })
+
+            for task_index in range(scale['tasks']):
+                task_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                tasks.append((task_id, project_id, members))
+                created = (now - timedelta(minutes=rng.randint(0, 10000))).isoformat()
+                writer.set(db.collection('Tasks').document(task_id), {
+                    'taskID': task_id,
+                    'projectID': project_id,
+                    'title': f'Task {task_index}',
+                    'description': 'Benchmark task',
+                    'status': rng.choice(STATUSES),
+                    'priority': rng.choice(PRIORITIES),
+                    'assignedTo': rng.choice(members),
+                    'dueDate': normalize_due_date((now + timedelta(days=rng.randint(-10, 60))).isoformat()),
+                    'commentCount': scale['comments'],
+                    'createdAt': created,
+                    'updatedAt': created
+                })
+
+                for subtask_index in range(scale['subtasks']):
+                    subtask_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                    writer.set(db.collection('Subtasks').document(subtask_id), {
+                        'subtaskID': subtask_id,
+                        'taskID': task_id,
+                        'projectID': project_id,
+                        'title': f'Subtask {subtask_index}',
+                        'description': None,
+                        'status': 'Not Started',
+                        'priority': rng.choice(PRIORITIES),
+                        'assignedTo': rng.choice(members),
+                        'dueDate': None,
+                        'createdAt': created,
+                        'updatedAt': created
+                    })
+
+                for comment_index in range(scale['comments']):
+                    comment_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                    writer.set(db.collection('Comments').document(comment_id), {
+                        'commentID': comment_id,
+                        'taskID': task_id,
+                        'projectID': project_id,
+                        'userID': rng.choice(members),
+                        'message': f'Comment {comment_index}',
+                        'createdAt': created
+                    })
+
+        for user_id, project_ids in memberships.items():
+            writer.update(db.collection('User').document(user_id), {'projects': project_ids})
+
+    return users, projects, tasks
+
+# Each scenario returns (method, url, json_body) for a randomly chosen target
+def scenarios(users, projects, tasks):
+    def project(rng):
+        return rng.choice(projects)[0]
+
+    def task(rng):
+        return rng.choice(tasks)
+
+    return {
+        'get_tasks': lambda rng: ('GET', f'/get_tasks?projectID={project(rng)}', None),
+        'get_tasks_page': lambda rng: ('GET', f'/get_tasks?projectID={project(rng)}&limit=25', None),
+        'get_subtasks': lambda rng: ('GET', f'/get_subtasks/{task(rng)[0]}', None),
+        'get_comments': lambda rng: ('GET', f'/get_comments?taskID={task(rng)[0]}', None),
+        'get_projects_by_user': lambda rng: ('GET', f'/get_projects?userID={rng.choice(users)}', None),
+        'get_projects_by_id': lambda rng: ('GET', f'/get_projects?projectID={project(rng)}', None),
+        'get_project_overview': lambda rng: ('GET', f'/get_project_overview?projectID={project(rng)}', None),
+        'project_board': lambda rng: ('GET', f'/project_board/{project(rng)}', None),
+        'project_stats': lambda rng: ('GET', f'/project_stats/{project(rng)}', None),
+        'users': lambda rng: ('GET', '/users', None),
+        'search': lambda rng: ('GET', f'/search?q=task {rng.randint(0, 9)}&projectID={project(rng)}', None),
+        'agenda': lambda rng: ('GET', f'/agenda?userID={rng.choice(users)}', None),
+        'sync': lambda rng: ('GET', f'/sync?projectID={project(rng)}&since={datetime.utcnow().isoformat()}', None),
+        'create_task': lambda rng: ('POST', '/create_task', {
+            'title': 'Bench task', 'projectID': project(rng), 'assignedTo': rng.choice(users)}),
+        'update_task': lambda rng: ('PUT', f'/update_task/{task(rng)[0]}', {
+            'status': rng.choice(STATUSES), 'priority': rng.choice(PRIORITIES)}),
+        'add_comment': lambda rng: ('POST', '/add_comment', {
+            'taskID': task(rng)[0], 'userID': rng.choice(users), 'message': 'Bench comment'}),
+    }
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def _call(client, method, url, body):
+    start = time.perf_counter()
+    response = client.open(url, method=method, json=body)
+    response.get_data()
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+# Average storage operations per request, measured one request at a time
+# so concurrent requests don't blur the counts
+def measure_rpcs(app, db, make_request, samples, rng, reset_caches):
+    client = app.test_client()
+    totals = {key: 0 for key in db.stats}
+    for _ in range(samples):
+        reset_caches()
+        before = dict(db.stats)
+        _call(client, *make_request(rng))
+        for key in totals:
+            totals[key] += db.stats[key] - before[key]
+    return {key: round(value / samples, 2) for key, value in totals.items()}
+
+def measure_latency(app, make_request, requests, concurrency, seed_value, reset_caches):
+    def worker(worker_index):
+        rng = random.Random(seed_value * 1000 + worker_index)
+        client = app.test_client()
+        results = []
+        for _ in range(requests // concurrency + (1 if worker_index < requests % concurrency else 0)):
+            reset_caches()
+            results.append(_call(client, *make_request(rng)))
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        batches = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    samples = [result for batch in batches for result in batch]
+    latencies = sorted(latency for latency, _ in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status in samples if status >= 400),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None
+    }
+
+def compare(results, baseline, max_regression):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('p95_ms'):
+            continue
+        change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms']
+        if change > max_regression:
+            regressions.append({'endpoint': name, 'baselineP95': previous['p95_ms'],
+                                'p95': result['p95_ms'], 'change': round(change, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API endpoints against the local storage engine')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--projects', type=int)
+    parser.add_argument('--tasks', type=int, help='tasks per project')
+    parser.add_argument('--subtasks', type=int, help='subtasks per task')
+    parser.add_argument('--comments', type=int, help='comments per task')
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rpc-samples', type=int, default=20)
+    parser.add_argument('--endpoints', help='comma-separated subset of scenarios')
+    parser.add_argument('--cold-cache', action='store_true', help='clear in-process caches before every request')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='previous JSON report to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    from app import app
+    from firebase_config import initialize_firebase
+    from project_stats import reconcile_project_stats
+    from search import rebuild_search_index
+    from user_cache import user_cache
+    from username_index import username_index
+
+    db, _ = initialize_firebase()
+    rng = random.Random(args.seed)
+
+    seed_start = time.perf_counter()
+    users, projects, tasks = seed(db, scale, rng)
+    rebuild_search_index()
+    reconcile_project_stats()
+    seed_seconds = time.perf_counter() - seed_start
+
+    def reset_caches():
+        if args.cold_cache:
+            user_cache.clear()
+            username_index._built_at = None
+
+    available = scenarios(users, projects, tasks)
+    selected = args.endpoints.split(',') if args.endpoints else list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        parser.error(f'unknown endpoints: {", ".join(unknown)}')
+
+    results = {}
+    for name in selected:
+        make_request = available[name]
+        result = measure_latency(app, make_request, args.requests, args.concurrency, args.seed, reset_caches)
+        result['storageOpsPerRequest'] = measure_rpcs(app, db, make_request, args.rpc_samples,
+                                                      random.Random(args.seed), reset_caches)
+        results[name] = result
+        print(f"{name:<22} p50={result['p50_ms']:>8}ms p95={result['p95_ms']:>8}ms "
+              f"p99={result['p99_ms']:>8}ms {result['throughput_rps']:>8} req/s "
+              f"ops={result['storageOpsPerRequest']}", file=sys.stderr)
+
+    report = {
+        'generatedAt': datetime.utcnow().isoformat(),
+        'config': {'scale': scale, 'requests': args.requests, 'concurrency': args.concurrency,
+                   'coldCache': args.cold_cache, 'seed': args.seed},
+        'seedSeconds': round(seed_seconds, 3),
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['regressions'] = compare(results, json.load(baseline_file), args.max_regression)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
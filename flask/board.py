@@ -0,0 +1,69 @@
+from flask import Blueprint, jsonify
+from firebase_config import db
+from user_hydration import attach_assignees, fetch_users, member_profiles
+from fanout import run_parallel
+from project_versions import etag_matches, not_modified, project_etag, with_etag
+from storage import IN_QUERY_LIMIT
+
+board_routes = Blueprint('board', __name__)
+
+def _subtasks_for(task_ids):
+    return list(db.collection('Subtasks').where('taskID', 'in', task_ids).stream())
+
+# Everything the project board renders in one response: the project, its
+# member profiles, and every task with its subtasks
+@board_routes.route('/project_board/<project_id>', methods=['GET'])
+def get_project_board(project_id):
+    try:
+        # An unchanged board costs one version read
+        etag = project_etag(project_id)
+        if etag_matches(etag):
+            return not_modified(etag)
+
+        project_doc, task_docs = run_parallel(
+            lambda: db.collection('Project').document(project_id).get(),
+            lambda: list(db.collection('Tasks').where('projectID', '==', project_id).stream())
+        )
+
+        if not project_doc.exists:
+            return jsonify({'error': 'Project not found'}), 404
+
+        project_data = project_doc.to_dict()
+        tasks = [doc.to_dict() for doc in task_docs]
+
+        # One batched 'in' query per IN_QUERY_LIMIT tasks, run concurrently
+        task_ids = [task['taskID'] for task in tasks]
+        subtask_batches = run_parallel(*[
+            (lambda chunk=task_ids[start:start + IN_QUERY_LIMIT]: _subtasks_for(chunk))
+            for start in range(0, len(task_ids), IN_QUERY_LIMIT)
+        ])
+
+        subtasks_by_task = {task_id: [] for task_id in task_ids}
+        all_subtasks = []
+        for batch in subtask_batches:
+            for doc in batch:
+                subtask = doc.to_dict()
+                subtasks_by_task.setdefault(subtask.get('taskID'), []).append(subtask)
+                all_subtasks.append(subtask)
+
+        # Members and every assignee are hydrated with one batched lookup
+        members = project_data.get('members', [])
+        users = fetch_users(
+            members
+            + [task.get('assignedTo') for task in tasks]
+            + [subtask.get('assignedTo') for subtask in all_subtasks]
+        )
+        attach_assignees(tasks, users)
+        attach_assignees(all_subtasks, users)
+
+        for task in tasks:
+            task['subtasks'] = subtasks_by_task.get(task['taskID'], [])
+
+        return with_etag(jsonify({
+            'project': project_data,
+            'memberProfiles': member_profiles(members, users),
+            'tasks': tasks
+        }), etag), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,350 @@
+from flask import Blueprint, request, jsonify
+from firebase_config import db
+from datetime import datetime
+from collections import Counter, defaultdict
+from batch_writer import MAX_BATCH_OPERATIONS
+from storage import get_documents
+from fanout import run_parallel
+from project_versions import bump_project_version
+from search import affects_index, index_item
+from notifications import affects_reminders, schedule_reminders
+from project_stats import apply_stats, stats_changes
+from dates import normalize_due_date
+from subtask import SUBTASK_UPDATE_FIELDS, new_subtask_document, project_id_for_subtask
+from task import TASK_UPDATE_FIELDS, new_task_document
+from user_hydration import fetch_users
+from username_index import AssigneeError, resolve_assignee, username_index
+
+bulk_routes = Blueprint('bulk', __name__)
+
+MAX_BULK_ITEMS = 1000
+
+def _existing(snapshots, collection, doc_id):
+    doc = snapshots.get(f'{collection}/{doc_id}') if doc_id else None
+    return doc if doc is not None and doc.exists else None
+
+# The items that are objects; the rest are reported as per-item errors
+def _objects(items):
+    return [item for item in items if isinstance(item, dict)]
+
+# Values of field across items that can be used as document IDs/keys
+def _strings(items, field):
+    return [item[field] for item in _objects(items) if isinstance(item.get(field), str) and item[field]]
+
+# Resolve every assignedUsername in the request with one index lookup
+def _lookup_usernames(items):
+    usernames = _strings(items, 'assignedUsername')
+    return username_index.lookup_many(usernames) if usernames else {}
+
+# Resolve an item's assignee from assignedTo (userID) or assignedUsername,
+# using the users and usernames read up front.
+# Returns (provided, userID, error); provided is False when neither is set.
+def _resolve_assignee(item, users, usernames):
+    if 'assignedTo' in item:
+        user_id = item['assignedTo']
+        if user_id and (not isinstance(user_id, str) or user_id not in users):
+            return True, None, f'Assigned user ({user_id}) not found'
+        return True, user_id or None, None
+
+    if 'assignedUsername' in item:
+        username = item['assignedUsername']
+        if not username:
+            return True, None, None
+        if not isinstance(username, str):
+            return True, None, 'assignedUsername must be a string'
+        try:
+            return True, resolve_assignee(username, usernames.get(username, [])), None
+        except AssigneeError as e:
+            return True, None, str(e)
+
+    return False, None, None
+
+# Records one item's writes (it stands in for a batch in index_item() etc.)
+# so they can be placed in a single commit
+class _ItemWrites:
+    def __init__(self):
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append(('set', ref, data, merge))
+
+    def update(self, ref, data):
+        self.ops.append(('update', ref, data))
+
+    def delete(self, ref):
+        self.ops.append(('delete', ref))
+
+# Commits validated items in batches of whole items, each batch also carrying
+# the stats and version writes for the items in it, so a failed commit leaves
+# the items before it completely written and the rest untouched
+class _BulkWriter:
+    def __init__(self, max_operations=MAX_BATCH_OPERATIONS):
+        self.max_operations = max_operations
+        self.committed = 0
+        self._batch = db.batch()
+        self._pending = 0
+        self._items = 0
+        self._stats = defaultdict(Counter)
+
+    def add(self, writes, project_id, changes):
+        # Two writes (stats and version) per project in the batch
+        projects = set(self._stats) | {project_id}
+        if self._items and self._pending + len(writes.ops) + 2 * len(projects) > self.max_operations:
+            self.flush()
+        for op, *args in writes.ops:
+            getattr(self._batch, op)(*args)
+        self._pending += len(writes.ops)
+        self._items += 1
+        self._stats[project_id].update(changes)
+
+    def flush(self):
+        if not self._items:
+            return
+        for project_id, changes in self._stats.items():
+            apply_stats(self._batch, project_id, changes)
+            bump_project_version(self._batch, project_id)
+        self._batch.commit()
+        self.committed += self._items
+        self._batch = db.batch()
+        self._pending = 0
+        self._items = 0
+        self._stats = defaultdict(Counter)
+
+# Write the prepared (writes, projectID, stats changes, result) items in
+# order. When a commit fails the results of the items not written become
+# errors, so a client can retry exactly those, and the error is returned.
+def _write_items(prepared):
+    writer = _BulkWriter()
+    try:
+        for writes, project_id, changes, _ in prepared:
+            writer.add(writes, project_id, changes)
+        writer.flush()
+        return None
+    except Exception as e:
+        for _, _, _, result in prepared[writer.committed:]:
+            result['status'] = 'error'
+            result['error'] = f'Not written: {e}'
+        return str(e)
+
+def _parse_payload(data):
+    creates = data.get('create', [])
+    updates = data.get('update', [])
+    if not isinstance(creates, list) or not isinstance(updates, list):
+        raise ValueError('create and update must be arrays')
+    if len(creates) + len(updates) > MAX_BULK_ITEMS:
+        raise ValueError(f'At most {MAX_BULK_ITEMS} items per request')
+    return creates, updates
+
+def _summary(create_results, update_results):
+    all_results = create_results + update_results
+    return {
+        'created': sum(1 for result in create_results if result['status'] == 'created'),
+        'updated': sum(1 for result in update_results if result['status'] == 'updated'),
+        'failed': sum(1 for result in all_results if result['status'] == 'error'),
+        'results': {'create': create_results, 'update': update_results}
+    }
+
+@bulk_routes.route('/bulk/tasks', methods=['POST'])
+def bulk_tasks():
+    try:
+        try:
+            creates, updates = _parse_payload(request.get_json() or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Every referenced project, task, user and username is read up front
+        # in batches
+        refs = [db.collection('Project').document(project_id) for project_id in _strings(creates, 'projectID')]
+        refs += [db.collection('Tasks').document(task_id) for task_id in _strings(updates, 'taskID')]
+        snapshots, users, usernames = run_parallel(
+            lambda: get_documents(refs),
+            lambda: fetch_users(_strings(creates + updates, 'assignedTo')),
+            lambda: _lookup_usernames(creates + updates)
+        )
+
+        create_results = []
+        update_results = []
+        # (writes, projectID, stats changes, result) for each valid item
+        prepared = []
+        # Each task as of the updates before it, so repeated taskIDs build on
+        # one another instead of all diffing against the snapshot
+        current = {}
+
+        for index, item in enumerate(creates):
+            if not isinstance(item, dict):
+                create_results.append({'index': index, 'status': 'error', 'error': 'Each item must be an object'})
+                continue
+            if not item.get('title') or not item.get('projectID'):
+                create_results.append({'index': index, 'status': 'error',
+                                       'error': 'Task title and projectID are required'})
+                continue
+            if not _existing(snapshots, 'Project', item['projectID']):
+                create_results.append({'index': index, 'status': 'error', 'error': 'Project does not exist'})
+                continue
+            _, assigned_to, error = _resolve_assignee(item, users, usernames)
+            if error:
+                create_results.append({'index': index, 'status': 'error', 'error': error})
+                continue
+
+            try:
+                task_data = new_task_document({**item, 'assignedTo': assigned_to})
+            except ValueError as e:
+                create_results.append({'index': index, 'status': 'error', 'error': str(e)})
+                continue
+            writes = _ItemWrites()
+            writes.set(db.collection('Tasks').document(task_data['taskID']), task_data)
+            index_item(writes, 'task', task_data['taskID'], task_data)
+            schedule_reminders(writes, 'task', task_data['taskID'], task_data)
+            result = {'index': index, 'status': 'created', 'taskID': task_data['taskID']}
+            prepared.append((writes, task_data['projectID'], stats_changes('task', new=task_data), result))
+            create_results.append(result)
+
+        for index, item in enumerate(updates):
+            if not isinstance(item, dict):
+                update_results.append({'index': index, 'status': 'error', 'error': 'Each item must be an object'})
+                continue
+            task_id = item.get('taskID')
+            task_doc = _existing(snapshots, 'Tasks', task_id)
+            if not task_doc:
+                update_results.append({'index': index, 'taskID': task_id, 'status': 'error',
+                                       'error': 'Task not found'})
+                continue
+            provided, assigned_to, error = _resolve_assignee(item, users, usernames)
+            if error:
+                update_results.append({'index': index, 'taskID': task_id, 'status': 'error', 'error': error})
+                continue
+
+            update_data = {field: item[field] for field in TASK_UPDATE_FIELDS if field in item}
+            if 'dueDate' in update_data:
+                try:
+                    update_data['dueDate'] = normalize_due_date(update_data['dueDate'])
+                except ValueError as e:
+                    update_results.append({'index': index, 'taskID': task_id, 'status': 'error', 'error': str(e)})
+                    continue
+            if provided:
+                update_data['assignedTo'] = assigned_to
+            update_data['updatedAt'] = datetime.utcnow().isoformat()
+
+            task = current.get(task_id) or task_doc.to_dict()
+            updated_task = current[task_id] = {**task, **update_data}
+            writes = _ItemWrites()
+            writes.update(task_doc.reference, update_data)
+            if affects_index('task', update_data):
+                index_item(writes, 'task', task_id, updated_task)
+            if affects_reminders('task', update_data):
+                schedule_reminders(writes, 'task', task_id, updated_task)
+            result = {'index': index, 'taskID': task_id, 'status': 'updated'}
+            prepared.append((writes, task.get('projectID'), stats_changes('task', task, updated_task), result))
+            update_results.append(result)
+
+        error = _write_items(prepared)
+        if error:
+            # Items reported as created/updated were committed; retry the rest
+            return jsonify({'error': error, **_summary(create_results, update_results)}), 500
+
+        return jsonify(_summary(create_results, update_results)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bulk_routes.route('/bulk/subtasks', methods=['POST'])
+def bulk_subtasks():
+    try:
+        try:
+            creates, updates = _parse_payload(request.get_json() or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        refs = [db.collection('Tasks').document(task_id) for task_id in _strings(creates, 'taskID')]
+        refs += [db.collection('Subtasks').document(subtask_id) for subtask_id in _strings(updates, 'subtaskID')]
+        snapshots, users, usernames = run_parallel(
+            lambda: get_documents(refs),
+            lambda: fetch_users(_strings(creates + updates, 'assignedTo')),
+            lambda: _lookup_usernames(creates + updates)
+        )
+
+        create_results = []
+        update_results = []
+        prepared = []
+        current = {}
+
+        for index, item in enumerate(creates):
+            if not isinstance(item, dict):
+                create_results.append({'index': index, 'status': 'error', 'error': 'Each item must be an object'})
+                continue
+            if not item.get('title') or not item.get('taskID'):
+                create_results.append({'index': index, 'status': 'error',
+                                       'error': 'Subtask title and taskID are required'})
+                continue
+            task_doc = _existing(snapshots, 'Tasks', item['taskID'])
+            if not task_doc:
+                create_results.append({'index': index, 'status': 'error', 'error': 'Task does not exist'})
+                continue
+            _, assigned_to, error = _resolve_assignee(item, users, usernames)
+            if error:
+                create_results.append({'index': index, 'status': 'error', 'error': error})
+                continue
+
+            project_id = task_doc.to_dict().get('projectID')
+            try:
+                subtask_data = new_subtask_document(item, project_id, assigned_to)
+            except ValueError as e:
+                create_results.append({'index': index, 'status': 'error', 'error': str(e)})
+                continue
+            writes = _ItemWrites()
+            writes.set(db.collection('Subtasks').document(subtask_data['subtaskID']), subtask_data)
+            index_item(writes, 'subtask', subtask_data['subtaskID'], subtask_data)
+            schedule_reminders(writes, 'subtask', subtask_data['subtaskID'], subtask_data)
+            result = {'index': index, 'status': 'created', 'subtaskID': subtask_data['subtaskID']}
+            prepared.append((writes, project_id, stats_changes('subtask', new=subtask_data), result))
+            create_results.append(result)
+
+        for index, item in enumerate(updates):
+            if not isinstance(item, dict):
+                update_results.append({'index': index, 'status': 'error', 'error': 'Each item must be an object'})
+                continue
+            subtask_id = item.get('subtaskID')
+            subtask_doc = _existing(snapshots, 'Subtasks', subtask_id)
+            if not subtask_doc:
+                update_results.append({'index': index, 'subtaskID': subtask_id, 'status': 'error',
+                                       'error': 'Subtask not found'})
+                continue
+            provided, assigned_to, error = _resolve_assignee(item, users, usernames)
+            if error:
+                update_results.append({'index': index, 'subtaskID': subtask_id, 'status': 'error',
+                                       'error': error})
+                continue
+
+            update_data = {field: item[field] for field in SUBTASK_UPDATE_FIELDS if field in item}
+            if 'dueDate' in update_data:
+                try:
+                    update_data['dueDate'] = normalize_due_date(update_data['dueDate'])
+                except ValueError as e:
+                    update_results.append({'index': index, 'subtaskID': subtask_id, 'status': 'error',
+                                           'error': str(e)})
+                    continue
+            if provided:
+                update_data['assignedTo'] = assigned_to
+            update_data['updatedAt'] = datetime.utcnow().isoformat()
+
+            subtask = current.get(subtask_id) or subtask_doc.to_dict()
+            updated_subtask = current[subtask_id] = {**subtask, **update_data}
+            writes = _ItemWrites()
+            writes.update(subtask_doc.reference, update_data)
+            if affects_index('subtask', update_data):
+                index_item(writes, 'subtask', subtask_id, updated_subtask)
+            if affects_reminders('subtask', update_data):
+                schedule_reminders(writes, 'subtask', subtask_id, updated_subtask)
+            result = {'index': index, 'subtaskID': subtask_id, 'status': 'updated'}
+            prepared.append((writes, project_id_for_subtask(subtask),
+                             stats_changes('subtask', subtask, updated_subtask), result))
+            update_results.append(result)
+
+        error = _write_items(prepared)
+        if error:
+            return jsonify({'error': error, **_summary(create_results, update_results)}), 500
+
+        return jsonify(_summary(create_results, update_results)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,195 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Blueprint, jsonify
+from firebase_config import db
+from storage import ArrayRemove, precondition_failed_error, unchanged_since
+from batch_writer import BatchWriter
+from project_versions import VERSIONS_COLLECTION, bump_project_version
+from sync import record_tombstone
+from search import unindex_item
+from notifications import REMINDER_LEAD_HOURS, cancel_reminders
+from project_stats import STATS_FIELDS, apply_stats, delete_stats, stats_changes
+from user_cache import user_cache
+from user_hydration import fetch_users
+
+cascade_routes = Blueprint('cascade', __name__)
+
+logger = logging.getLogger(__name__)
+
+# Background deletes run off the request threads; only recent jobs are kept
+# in memory, for live progress on the worker running them. Each job's state
+# is also saved to DeleteJobs (when queued, started and finished) so that
+# any worker can answer /delete_jobs/<id>.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cascade')
+MAX_TRACKED_JOBS = 200
+DELETE_JOBS_COLLECTION = 'DeleteJobs'
+
+# At most this many writes are queued for one deleted item (delete, unindex,
+# tombstone, reminders, stats, version)
+ITEM_WRITES = 5 + len(REMINDER_LEAD_HOURS)
+
+class DeleteJob:
+    def __init__(self, kind, target_id):
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.target_id = target_id
+        self.status = 'pending'
+        self.queued = 0
+        self.writer = None
+        self.error = None
+        # The job failed because an item changed after it was read
+        self.conflict = False
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'jobID': self.job_id,
+            'kind': self.kind,
+            'targetID': self.target_id,
+            'status': self.status,
+            'queuedDeletes': self.queued,
+            'committedWrites': self.writer.committed if self.writer else 0,
+            'error': self.error,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at
+        }
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+# Stop accepting background deletes; with wait, block until queued ones finish
+def shutdown_background_jobs(wait=True):
+    _executor.shutdown(wait=wait)
+
+# The job's state as a dict, from this worker's registry or DeleteJobs
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    job_doc = db.collection(DELETE_JOBS_COLLECTION).document(job_id).get()
+    return job_doc.to_dict() if job_doc.exists else None
+
+# A failed save only costs other workers a stale view of the job
+def _save(job):
+    try:
+        db.collection(DELETE_JOBS_COLLECTION).document(job.job_id).set(job.to_dict())
+    except Exception:
+        logger.exception('Could not save delete job %s', job.job_id)
+
+def _track(job):
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        while len(_jobs) > MAX_TRACKED_JOBS:
+            _jobs.popitem(last=False)
+
+def _run(job, work, background=False):
+    job.status = 'running'
+    job.started_at = datetime.utcnow().isoformat()
+    if background:
+        _save(job)
+    try:
+        with BatchWriter(db) as writer:
+            job.writer = writer
+            work(writer, job)
+        job.status = 'done'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        job.conflict = isinstance(e, precondition_failed_error())
+    finally:
+        job.finished_at = datetime.utcnow().isoformat()
+        _save(job)
+    return job
+
+# Run a cascade inline, or in the background when requested; either way the
+# returned job describes the outcome/progress
+def _start(kind, target_id, work, background):
+    job = DeleteJob(kind, target_id)
+    _track(job)
+    if background:
+        _save(job)
+        _executor.submit(_run, job, work, True)
+        return job
+    return _run(job, work)
+
+# Children are queued before their parent, so an interrupted cascade leaves
+# the parent in place and can simply be retried. Given the task's snapshot
+# (deleting one task), the project's stats are kept in step: each item's
+# stats change commits with its delete, and each delete only commits while
+# the item is unchanged since it was read. A job that fails this way has
+# conflict set and can be re-run from a fresh snapshot.
+def _delete_task_tree(writer, job, task_id, project_id, task_doc=None):
+    for collection, kind in (('Subtasks', 'subtask'), ('Comments', 'comment')):
+        fields = STATS_FIELDS if kind == 'subtask' and task_doc is not None else []
+        for doc in db.collection(collection).where('taskID', '==', task_id).select(fields).stream():
+            writer.reserve(ITEM_WRITES)
+            if fields:
+                writer.delete(doc.reference, option=unchanged_since(doc))
+                apply_stats(writer, project_id, stats_changes(kind, old=doc.to_dict()))
+            else:
+                writer.delete(doc.reference)
+            unindex_item(writer, kind, doc.id)
+            if kind != 'comment':
+                record_tombstone(writer, kind, doc.id, project_id)
+                cancel_reminders(writer, kind, doc.id)
+            job.queued += 1
+
+    writer.reserve(ITEM_WRITES)
+    if task_doc is not None:
+        writer.delete(task_doc.reference, option=unchanged_since(task_doc))
+        apply_stats(writer, project_id, stats_changes('task', old=task_doc.to_dict()))
+        bump_project_version(writer, project_id)
+    else:
+        writer.delete(db.collection('Tasks').document(task_id))
+    unindex_item(writer, 'task', task_id)
+    record_tombstone(writer, 'task', task_id, project_id)
+    cancel_reminders(writer, 'task', task_id)
+    job.queued += 1
+
+def delete_task_cascade(task_doc, background=False):
+    def work(writer, job):
+        _delete_task_tree(writer, job, task_doc.id, task_doc.to_dict().get('projectID'), task_doc)
+
+    return _start('task', task_doc.id, work, background)
+
+def delete_project_cascade(project_id, project_data, background=False):
+    member_ids = project_data.get('members', [])
+
+    def work(writer, job):
+        for task_doc in db.collection('Tasks').where('projectID', '==', project_id).select([]).stream():
+            _delete_task_tree(writer, job, task_doc.id, project_id)
+
+        existing_users = fetch_users(member_ids)
+        for member_id in member_ids:
+            if member_id in existing_users:
+                writer.update(db.collection('User').document(member_id),
+                              {'projects': ArrayRemove([project_id])})
+
+        record_tombstone(writer, 'project', project_id, project_id)
+        writer.delete(db.collection(VERSIONS_COLLECTION).document(project_id))
+        delete_stats(writer, project_id)
+        writer.delete(db.collection('Project').document(project_id))
+        cancel_reminders(writer, 'project', project_id)
+        job.queued += 1
+
+        writer.flush()
+        user_cache.invalidate(*member_ids)
+
+    return _start('project', project_id, work, background)
+
+@cascade_routes.route('/delete_jobs/<job_id>', methods=['GET'])
+def get_delete_job(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
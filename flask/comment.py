@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
+from firebase_config import db
+from storage import Increment
+from batch_writer import BatchWriter
+from collections import Counter
+from user_hydration import attach_authors, get_user
+from fanout import run_parallel
+from pagination import DOCUMENT_ID, fetch_page
+from streaming import stream_items, stream_requested
+from project_versions import bump_project_version, etag_matches, not_modified, project_etag, with_etag
+from search import index_item
 from datetime import datetime
 import uuid
 
-db, _ = initialize_firebase()
 comment_routes = Blueprint('comment', __name__)
 
 @comment_routes.route('/add_comment', methods=['POST'])
@@ -17,26 +25,37 @@ def add_comment():
         if not task_id or not user_id or not message:
             return jsonify({'error': 'taskID, userID, and message are required'}), 400
 
-        # ✅ Check if task exists
-        task_doc = db.collection('Tasks').document(task_id).get()
+        # ✅ Check the task and the user concurrently
+        task_doc, user_data = run_parallel(
+            lambda: db.collection('Tasks').document(task_id).get(),
+            lambda: get_user(user_id)
+        )
+
         if not task_doc.exists:
             return jsonify({'error': 'Task does not exist'}), 404
 
         # ✅ Check if user exists
-        user_doc = db.collection('User').document(user_id).get()
-        if not user_doc.exists:
+        if not user_data:
             return jsonify({'error': 'User does not exist'}), 404
 
+        project_id = task_doc.to_dict().get('projectID')
         comment_id = str(uuid.uuid4())
         comment_data = {
             'commentID': comment_id,
             'taskID': task_id,
+            'projectID': project_id,
             'userID': user_id,
             'message': message,
             'createdAt': datetime.utcnow().isoformat()
         }
 
-        db.collection('Comments').document(comment_id).set(comment_data)
+        # Write the comment and bump the task's denormalized counter atomically
+        batch = db.batch()
+        batch.set(db.collection('Comments').document(comment_id), comment_data)
+        index_item(batch, 'comment', comment_id, comment_data)
+        batch.update(db.collection('Tasks').document(task_id), {'commentCount': Increment(1)})
+        bump_project_version(batch, project_id)
+        batch.commit()
 
         return jsonify({'message': 'Comment added successfully', 'commentId': comment_id}), 201
 
@@ -56,34 +75,50 @@ def get_comments():
         if not task_doc.exists:
             return jsonify({'error': 'Task does not exist'}), 404
 
-        # Proceed to query comments for this task
-        comments_ref = db.collection('Comments') \
-                         .where('taskID', '==', task_id) \
-                         .order_by('createdAt')
-        comment_docs = comments_ref.stream()
-
-        comments = []
-        for doc in comment_docs:
-            comment = doc.to_dict()
-
-            # Attach user info
-            user_id = comment.get('userID')
-            if user_id:
-                user_doc = db.collection('User').document(user_id).get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
-                    comment['username'] = user_data.get('name', '')
-                    comment['avatar'] = user_data.get('avatar', '')
-                else:
-                    comment['username'] = 'Unknown User'
-                    comment['avatar'] = ''
-            else:
-                comment['username'] = 'Anonymous'
-                comment['avatar'] = ''
-
-            comments.append(comment)
-
-        return jsonify({'comments': comments}), 200
+        etag = None
+        if task_doc.to_dict().get('projectID'):
+            etag = project_etag(task_doc.to_dict()['projectID'])
+            if etag_matches(etag):
+                return not_modified(etag)
+
+        # Proceed to query comments for this task, oldest first
+        comments_ref = db.collection('Comments').where('taskID', '==', task_id)
+
+        streaming = stream_requested()
+        try:
+            comment_docs, next_cursor = fetch_page(comments_ref, ['createdAt', DOCUMENT_ID],
+                                                   required_fields=['commentID', 'userID'], lazy=streaming)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if streaming:
+            return with_etag(stream_items('comments', (doc.to_dict() for doc in comment_docs),
+                                          hydrate=attach_authors, next_cursor=next_cursor), etag)
+
+        comments = [doc.to_dict() for doc in comment_docs]
+
+        # Attach user info with one batched lookup for all authors
+        attach_authors(comments)
+
+        return with_etag(jsonify({'comments': comments, 'nextCursor': next_cursor}), etag), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+# Recompute every Task's commentCount from the Comments collection and fix
+# any that drifted. Returns the number of tasks updated.
+def reconcile_comment_counts():
+    counts = Counter(
+        doc.to_dict().get('taskID')
+        for doc in db.collection('Comments').select(['taskID']).stream()
+    )
+
+    updated = 0
+    with BatchWriter(db) as writer:
+        for task_doc in db.collection('Tasks').select(['commentCount']).stream():
+            actual = counts.get(task_doc.id, 0)
+            if task_doc.to_dict().get('commentCount') != actual:
+                writer.update(task_doc.reference, {'commentCount': actual})
+                updated += 1
+
+    return updated
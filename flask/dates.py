@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+# Due dates are stored as UTC 'YYYY-MM-DDTHH:MM:SSZ' strings: string order is
+# time order, so Firestore range queries on dueDate work, and the Z keeps
+# clients (JS `new Date()`) from reading them as local time
+DUE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Task/subtask statuses that close an item: it is no longer due, overdue or
+# open for reminders and rollups
+DONE_STATUSES = {'Done', 'Completed'}
+
+def _parse(value):
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid date: {value!r}')
+    if isinstance(value, (int, float)):
+        # Epoch seconds, or milliseconds as sent by JavaScript clients
+        seconds = value / 1000 if abs(value) > 1e11 else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    text = str(value).strip()
+    if text.endswith('Z') or text.endswith('z'):
+        text = text[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f'Invalid date: {value!r}')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed
+
+# Normalize a client-supplied date (ISO 8601 with or without time/offset, or
+# epoch seconds/milliseconds). Empty values stay None; anything unparseable
+# raises ValueError.
+def normalize_due_date(value):
+    if value is None or value == '':
+        return None
+    return _parse(value).replace(tzinfo=None).strftime(DUE_DATE_FORMAT)
+
+def _is_bare_date(value):
+    return isinstance(value, str) and len(value.strip()) == 10
+
+# Parse a date range bound from a query string into the stored format. Upper
+# bounds come back exclusive but still cover what was asked for: a bare date
+# includes that whole day, a timestamp includes that second.
+def parse_range_bound(value, upper=False):
+    parsed = _parse(value).replace(tzinfo=None, microsecond=0)
+    if upper:
+        parsed += timedelta(days=1) if _is_bare_date(value) else timedelta(seconds=1)
+    return parsed.strftime(DUE_DATE_FORMAT)
@@ -0,0 +1,19 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pool shared by all requests for independent Firestore reads
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='fanout')
+
+# Run independent zero-argument calls concurrently and return their results
+# in the same order. The first call runs on the request thread so a single
+# call never pays for a thread hop. Exceptions propagate to the caller.
+# Each call runs in a copy of the caller's context so per-request storage
+# accounting follows it onto the pool.
+def run_parallel(*calls):
+    futures = [_executor.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+    results = [calls[0]()] if calls else []
+    results.extend(future.result() for future in futures)
+    return results
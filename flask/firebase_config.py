@@ -1,10 +1,54 @@
 # firebase_configure.py
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
+import os
+import threading
+from instrumentation import instrument_client
+
+# 'firestore' (default) talks to Firebase; 'sqlite' runs against the local
+# engine in local_store.py, stored at SQLITE_PATH (':memory:' for throwaway runs)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'local_store.sqlite3')
+
+# One client/auth pair per process, created on first use. firebase_admin and
+# the gRPC stack are only imported then, so importing the app stays cheap.
+_clients = None
+_lock = threading.Lock()
 
 def initialize_firebase():
+    global _clients
+    if _clients is not None:
+        return _clients
+
+    with _lock:
+        if _clients is None:
+            _clients = _create_clients()
+    return _clients
+
+def _create_clients():
+    if STORAGE_BACKEND == 'sqlite':
+        from local_store import LocalAuth, LocalClient
+        client = LocalClient(SQLITE_PATH)
+        return instrument_client(client), LocalAuth(client)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore, auth
+
     if not firebase_admin._apps:
         cred = credentials.Certificate("firebase_config.json")
         firebase_admin.initialize_app(cred)
 
-    return firestore.client(), auth
\ No newline at end of file
+    return instrument_client(firestore.client()), auth
+
+def is_initialized():
+    return _clients is not None
+
+# Stands in for the client (or auth module) at import time and resolves it on
+# first attribute access
+class _Lazy:
+    def __init__(self, index):
+        self._index = index
+
+    def __getattr__(self, name):
+        return getattr(initialize_firebase()[self._index], name)
+
+db = _Lazy(0)
+auth = _Lazy(1)
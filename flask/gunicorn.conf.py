@@ -0,0 +1,71 @@
+# Production serving: `gunicorn -c gunicorn.conf.py app:app` from this directory
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '3000')}"
+
+# Handlers mostly wait on Firestore, so each worker runs a thread pool;
+# workers spread the CPU-bound parts (JSON, hydration) across cores.
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Every open /subscribe stream holds one thread for as long as it is open, so
+# a worker takes at most half its threads in streams and answers 503 beyond
+# that. For many live screens, route /subscribe/* at the proxy to a separate
+# realtime pool whose threads mostly sit waiting on their queues, e.g.
+#   WEB_CONCURRENCY=2 GUNICORN_THREADS=256 REALTIME_MAX_SUBSCRIBERS=250 \
+#   PORT=3001 gunicorn -c gunicorn.conf.py app:app
+os.environ.setdefault('REALTIME_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+# Workers share their /metrics through snapshot files in this directory (see
+# metrics.py), so every scrape sees the whole server; workers inherit it
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'task-api-metrics-{os.getpid()}'))
+
+def on_starting(server):
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['METRICS_DIR'])
+
+def on_exit(server):
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+# gRPC channels don't survive fork, so the app (and its Firestore client) is
+# loaded in each worker rather than in the master
+preload_app = False
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# The app is loaded by now: create this worker's client, mark it ready, and
+# start draining (readiness off, SSE streams closed) when the master asks
+# the worker to stop
+def post_worker_init(worker):
+    from lifecycle import begin_shutdown, mark_ready
+
+    mark_ready()
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_term(signum, frame):
+        begin_shutdown(wait=False)
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_term)
+
+# Let background deletes that were already queued finish before exiting
+def worker_exit(server, worker):
+    from lifecycle import begin_shutdown
+
+    begin_shutdown(wait=True)
@@ -0,0 +1,39 @@
+import os
+import threading
+
+# Outbound HTTP (identitytoolkit, signing keys) goes through one keep-alive
+# session per process instead of a new connection per call
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+
+_session = None
+_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is not None:
+        return _session
+
+    with _lock:
+        if _session is None:
+            # requests is only imported once something actually calls out
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            # Only idempotent methods are retried; a login POST is not
+            retries = Retry(total=HTTP_RETRIES, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                            allowed_methods=frozenset(['GET', 'HEAD']))
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+def post_json(url, payload, timeout=HTTP_TIMEOUT):
+    return get_session().post(url, json=payload, timeout=timeout)
+
+def get(url, timeout=HTTP_TIMEOUT):
+    return get_session().get(url, timeout=timeout)
@@ -0,0 +1,215 @@
+import contextvars
+import os
+import threading
+import time
+
+# Set INSTRUMENT_FIRESTORE=0 to hand out the raw client
+INSTRUMENT_FIRESTORE = os.getenv('INSTRUMENT_FIRESTORE', '1') not in ('0', 'false', 'no')
+
+# Storage operations made while serving one request. Every RPC counts once:
+# a document get, a get_all, a query, a batch commit or a direct write.
+# reads counts documents returned (including streamed query results).
+# run_parallel() copies the request's context, so fan-out threads record
+# into the same instance concurrently.
+class RequestStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rpcs = 0
+        self.reads = 0
+        self.queries = 0
+        self.streamed = 0
+        self.writes = 0
+        self.storage_seconds = 0.0
+        self.calls = {}
+
+    def record(self, kind, seconds, reads=0, streamed=0, writes=0):
+        with self._lock:
+            self.rpcs += 1
+            self.reads += reads
+            self.streamed += streamed
+            self.writes += writes
+            if kind == 'query':
+                self.queries += 1
+            self.storage_seconds += seconds
+            count, total = self.calls.get(kind, (0, 0.0))
+            self.calls[kind] = (count + 1, total + seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'rpcs': self.rpcs,
+                'reads': self.reads,
+                'queries': self.queries,
+                'streamed': self.streamed,
+                'writes': self.writes,
+                'storageMs': round(self.storage_seconds * 1000, 3)
+            }
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+def start_request_stats():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+def end_request_stats(token):
+    _current.reset(token)
+
+def current_request_stats():
+    return _current.get()
+
+def _record(kind, started, **counts):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(kind, time.perf_counter() - started, **counts)
+
+def _unwrap(value):
+    return value._target if isinstance(value, _Wrapped) else value
+
+# The wrappers below only intercept calls that reach the backend (and the
+# builders returning further wrappers); everything else is delegated as-is.
+class _Wrapped:
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+class InstrumentedQuery(_Wrapped):
+    def _chain(self, method, *args, **kwargs):
+        args = [_unwrap(arg) for arg in args]
+        return InstrumentedQuery(getattr(self._target, method)(*args, **kwargs))
+
+    def where(self, *args, **kwargs):
+        return self._chain('where', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._chain('order_by', *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._chain('limit', *args, **kwargs)
+
+    def offset(self, *args, **kwargs):
+        return self._chain('offset', *args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        return self._chain('select', *args, **kwargs)
+
+    def start_after(self, *args, **kwargs):
+        return self._chain('start_after', *args, **kwargs)
+
+    def start_at(self, *args, **kwargs):
+        return self._chain('start_at', *args, **kwargs)
+
+    def end_before(self, *args, **kwargs):
+        return self._chain('end_before', *args, **kwargs)
+
+    def end_at(self, *args, **kwargs):
+        return self._chain('end_at', *args, **kwargs)
+
+    # Only time spent waiting on the backend is counted, not time the caller
+    # spends between documents
+    def stream(self, *args, **kwargs):
+        stats = _current.get()
+        started = time.perf_counter()
+        iterator = iter(self._target.stream(*args, **kwargs))
+        streamed = 0
+        elapsed = time.perf_counter() - started
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    doc = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    break
+                elapsed += time.perf_counter() - started
+                streamed += 1
+                yield doc
+        finally:
+            if stats is not None:
+                stats.record('query', elapsed, reads=streamed, streamed=streamed)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+class InstrumentedCollection(InstrumentedQuery):
+    def document(self, *args, **kwargs):
+        return InstrumentedDocument(self._target.document(*args, **kwargs))
+
+class InstrumentedDocument(_Wrapped):
+    def collection(self, name):
+        return InstrumentedCollection(self._target.collection(name))
+
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        snapshot = self._target.get(*args, **kwargs)
+        _record('get', started, reads=1)
+        return snapshot
+
+    def _write(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        result = getattr(self._target, method)(*args, **kwargs)
+        _record('write', started, writes=1)
+        return result
+
+    def set(self, *args, **kwargs):
+        return self._write('set', *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._write('create', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write('delete', *args, **kwargs)
+
+class InstrumentedBatch(_Wrapped):
+    def __init__(self, target):
+        super().__init__(target)
+        self._operations = 0
+
+    def _queue(self, method, reference, *args, **kwargs):
+        self._operations += 1
+        getattr(self._target, method)(_unwrap(reference), *args, **kwargs)
+        return self
+
+    def set(self, reference, *args, **kwargs):
+        return self._queue('set', reference, *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs):
+        return self._queue('create', reference, *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        return self._queue('update', reference, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        return self._queue('delete', reference, *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._target.commit(*args, **kwargs)
+        _record('commit', started, writes=self._operations)
+        self._operations = 0
+        return result
+
+class InstrumentedClient(_Wrapped):
+    def collection(self, name):
+        return InstrumentedCollection(self._target.collection(name))
+
+    def document(self, *args, **kwargs):
+        return InstrumentedDocument(self._target.document(*args, **kwargs))
+
+    def batch(self):
+        return InstrumentedBatch(self._target.batch())
+
+    def get_all(self, references, *args, **kwargs):
+        started = time.perf_counter()
+        snapshots = list(self._target.get_all([_unwrap(ref) for ref in references], *args, **kwargs))
+        _record('get_all', started, reads=len(snapshots))
+        return snapshots
+
+def instrument_client(client):
+    if not INSTRUMENT_FIRESTORE or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
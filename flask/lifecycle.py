@@ -0,0 +1,60 @@
+import threading
+from flask import Blueprint, jsonify
+from firebase_config import initialize_firebase
+
+lifecycle_routes = Blueprint('lifecycle', __name__)
+
+# Per-process serving state. A worker is ready once its storage client is up
+# and stops being ready as soon as it starts draining.
+_state = {'ready': False, 'draining': False}
+_lock = threading.Lock()
+
+def mark_ready():
+    from metrics import snapshot_writer
+    from notifications import start_reminder_worker
+
+    initialize_firebase()
+    start_reminder_worker()
+    snapshot_writer.start()
+    with _lock:
+        _state['ready'] = True
+
+def is_ready():
+    with _lock:
+        return _state['ready'] and not _state['draining']
+
+# Stop advertising readiness, end open SSE streams (which would otherwise hold
+# the worker until the graceful timeout), stop polling for reminders and let
+# queued background deletes finish, then write the final metrics snapshot.
+# Safe to call more than once: draining starts on the first call, and any
+# call with wait still blocks until the queued deletes are done.
+def begin_shutdown(wait=True):
+    with _lock:
+        first_call = not _state['draining']
+        _state['draining'] = True
+
+    from cascade import shutdown_background_jobs
+    from metrics import snapshot_writer
+    from notifications import reminder_worker
+    from realtime import hub
+
+    if first_call:
+        hub.close()
+        reminder_worker.stop()
+    if first_call or wait:
+        shutdown_background_jobs(wait=wait)
+        snapshot_writer.stop()
+
+# Liveness: the process is up and serving requests
+@lifecycle_routes.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'}), 200
+
+# Readiness: route traffic here only while this returns 200
+@lifecycle_routes.route('/readyz', methods=['GET'])
+def readyz():
+    if not is_ready():
+        with _lock:
+            status = 'draining' if _state['draining'] else 'starting'
+        return jsonify({'status': status}), 503
+    return jsonify({'status': 'ready'}), 200
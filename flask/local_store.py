@@ -0,0 +1,539 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from enum import Enum
+
+# A local, Firestore-shaped document store backed by SQLite. It implements the
+# subset of the google-cloud-firestore client API the blueprints use, so the
+# service can run offline and be benchmarked without a Firebase project.
+# Documents are stored as JSON; equality filters on INDEXED_FIELDS are pushed
+# down to SQLite expression indexes and everything else is evaluated in Python.
+
+INDEXED_FIELDS = ['projectID', 'taskID', 'assignedTo', 'email']
+
+DOCUMENT_ID = '__name__'
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+class ArrayRemove:
+    def __init__(self, values):
+        self.values = list(values)
+
+class _DeleteField:
+    def __repr__(self):
+        return 'DELETE_FIELD'
+
+DELETE_FIELD = _DeleteField()
+
+class NotFound(Exception):
+    pass
+
+class AlreadyExists(Exception):
+    pass
+
+class FailedPrecondition(Exception):
+    pass
+
+# Write option that only lets a write through while the document is unchanged
+# since a snapshot, as returned by client.write_option(last_update_time=...)
+class LastUpdateOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+def _json_path(field):
+    return '$.' + '.'.join(f'"{part}"' for part in field.split('.'))
+
+def _get_field(data, field):
+    value = data
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(field)
+        value = value[part]
+    return value
+
+# Firestore orders values by type first, then by value
+def _sort_key(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, list):
+        return (8, [_sort_key(item) for item in value])
+    if isinstance(value, dict):
+        return (9, json.dumps(value, sort_keys=True, default=str))
+    return (10, str(value))
+
+def _matches(data, doc_id, field, op, value):
+    try:
+        actual = doc_id if field == DOCUMENT_ID else _get_field(data, field)
+    except KeyError:
+        return False
+    if isinstance(value, DocumentReference):
+        value = value.id
+
+    if op == '==':
+        return _sort_key(actual) == _sort_key(value)
+    if op == '!=':
+        return actual is not None and _sort_key(actual) != _sort_key(value)
+    if op == 'in':
+        return any(_sort_key(actual) == _sort_key(candidate) for candidate in value)
+    if op == 'not-in':
+        return actual is not None and all(_sort_key(actual) != _sort_key(candidate) for candidate in value)
+    if op == 'array_contains':
+        return isinstance(actual, list) and any(_sort_key(item) == _sort_key(value) for item in actual)
+    if op == 'array_contains_any':
+        return isinstance(actual, list) and any(
+            _sort_key(item) == _sort_key(candidate) for item in actual for candidate in value)
+
+    actual_key, value_key = _sort_key(actual), _sort_key(value)
+    if actual_key[0] != value_key[0]:
+        return False
+    if op == '<':
+        return actual_key < value_key
+    if op == '<=':
+        return actual_key <= value_key
+    if op == '>':
+        return actual_key > value_key
+    if op == '>=':
+        return actual_key >= value_key
+    raise ValueError(f'Unsupported operator: {op}')
+
+# Apply a write's value (which may hold transforms) on top of `current`
+def _apply_value(current, value):
+    if isinstance(value, Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(item)
+        return result
+    if isinstance(value, ArrayRemove):
+        return [item for item in current if item not in value.values] if isinstance(current, list) else []
+    if isinstance(value, dict):
+        return {key: _apply_value(None, item) for key, item in value.items() if item is not DELETE_FIELD}
+    return copy.deepcopy(value)
+
+def _merge(target, data):
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _apply_value(target.get(key), value)
+
+def _set_path(target, field, value):
+    parts = field.split('.')
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    if value is DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _apply_value(target.get(parts[-1]), value)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, fields=None, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = data
+        self._fields = fields
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        if self._fields is None:
+            return copy.deepcopy(self._data)
+        projected = {}
+        for field in self._fields:
+            try:
+                _set_path(projected, field, _get_field(self._data, field))
+            except KeyError:
+                pass
+        return projected
+
+    def get(self, field):
+        return _get_field(self._data or {}, field)
+
+
+class DocumentReference:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self.id = doc_id
+        self.parent = CollectionReference(client, collection)
+        self.path = f'{collection}/{doc_id}'
+
+    def get(self):
+        return self._client._get(self)
+
+    def set(self, data, merge=False):
+        self._client._commit([('set', self, data, merge, None)])
+
+    def create(self, data):
+        self._client._commit([('create', self, data, False, None)])
+
+    def update(self, data, option=None):
+        self._client._commit([('update', self, data, False, option)])
+
+    def delete(self, option=None):
+        self._client._commit([('delete', self, None, False, option)])
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self.parent.id, [(DOCUMENT_ID, '==', self.id)], callback)
+
+
+class Query:
+    def __init__(self, client, collection, filters=(), orders=(), limit_count=None, cursor=None, fields=None):
+        self._client = client
+        self._collection = collection
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit_count
+        self._cursor = cursor
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit_count': self._limit,
+            'cursor': self._cursor,
+            'fields': self._fields
+        }
+        state.update(changes)
+        return Query(self._client, self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def start_after(self, values):
+        return self._copy(cursor=values)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def stream(self):
+        return iter(self._client._run_query(self))
+
+    def get(self):
+        return self._client._run_query(self)
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self._collection, self._filters, callback)
+
+
+class CollectionReference(Query):
+    def __init__(self, client, collection):
+        super().__init__(client, collection)
+        self.id = collection
+
+    def document(self, doc_id=None):
+        return DocumentReference(self._client, self._collection, doc_id or uuid.uuid4().hex)
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(('set', reference, data, merge, None))
+
+    def create(self, reference, data):
+        self._writes.append(('create', reference, data, False, None))
+
+    def update(self, reference, data, option=None):
+        self._writes.append(('update', reference, data, False, option))
+
+    def delete(self, reference, option=None):
+        self._writes.append(('delete', reference, None, False, option))
+
+    def commit(self):
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+class ChangeType(Enum):
+    ADDED = 'ADDED'
+    MODIFIED = 'MODIFIED'
+    REMOVED = 'REMOVED'
+
+class DocumentChange:
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+class Watch:
+    def __init__(self, client, collection, filters, callback):
+        self._client = client
+        self.collection = collection
+        self.filters = filters
+        self.callback = callback
+        self.results = {}
+        self.delivered = False
+
+    def unsubscribe(self):
+        self._client._unwatch(self)
+
+
+class LocalClient:
+    def __init__(self, path=':memory:'):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._watches = []
+        self.stats = {'reads': 0, 'queries': 0, 'writes': 0, 'commits': 0}
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,'
+                ' PRIMARY KEY (collection, id))'
+            )
+            # Files created before update times were tracked
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(documents)')]
+            if 'updated' not in columns:
+                self._conn.execute('ALTER TABLE documents ADD COLUMN updated INTEGER NOT NULL DEFAULT 0')
+            for field in INDEXED_FIELDS:
+                self._conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_documents_{field} '
+                    f"ON documents (collection, json_extract(data, '{_json_path(field)}'))"
+                )
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def write_option(self, last_update_time):
+        return LastUpdateOption(last_update_time)
+
+    def get_all(self, references):
+        return [self._get(reference) for reference in references]
+
+    def _load(self, collection, doc_id):
+        return self._load_with_time(collection, doc_id)[0]
+
+    def _load_with_time(self, collection, doc_id):
+        row = self._conn.execute(
+            'SELECT data, updated FROM documents WHERE collection = ? AND id = ?', (collection, doc_id)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def _get(self, reference):
+        with self._lock:
+            self.stats['reads'] += 1
+            data, updated = self._load_with_time(reference.parent.id, reference.id)
+            return DocumentSnapshot(reference, data, update_time=updated)
+
+    # (id, data, update time) of the documents matching filters
+    def _candidates(self, collection, filters):
+        sql = 'SELECT id, data, updated FROM documents WHERE collection = ?'
+        params = [collection]
+        for field, op, value in filters:
+            if op == '==' and field in INDEXED_FIELDS and isinstance(value, (str, int, float)) \
+                    and not isinstance(value, bool):
+                sql += f" AND json_extract(data, '{_json_path(field)}') = ?"
+                params.append(value)
+            elif op == 'array_contains' and isinstance(value, str):
+                # Not index-backed, but skips decoding non-matching rows
+                sql += f" AND EXISTS (SELECT 1 FROM json_each(data, '{_json_path(field)}') WHERE value = ?)"
+                params.append(value)
+        rows = self._conn.execute(sql, params).fetchall()
+        return [
+            (doc_id, data, updated)
+            for doc_id, data, updated in ((row[0], json.loads(row[1]), row[2]) for row in rows)
+            if all(_matches(data, doc_id, field, op, value) for field, op, value in filters)
+        ]
+
+    def _run_query(self, query):
+        with self._lock:
+            self.stats['queries'] += 1
+            matches = self._candidates(query._collection, query._filters)
+
+        orders = list(query._orders)
+        if not any(field == DOCUMENT_ID for field, _ in orders):
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else 'ASCENDING'))
+
+        def order_values(doc_id, data):
+            return [doc_id if field == DOCUMENT_ID else _get_field(data, field) for field, _ in orders]
+
+        # Documents missing an order_by field are excluded, as in Firestore
+        rows = []
+        for doc_id, data, updated in matches:
+            try:
+                rows.append((order_values(doc_id, data), doc_id, data, updated))
+            except KeyError:
+                continue
+
+        for index in reversed(range(len(orders))):
+            descending = orders[index][1] == 'DESCENDING'
+            rows.sort(key=lambda row: _sort_key(row[0][index]), reverse=descending)
+
+        if query._cursor is not None:
+            rows = [row for row in rows if self._after_cursor(row, orders, query._cursor)]
+        if query._limit is not None:
+            rows = rows[:query._limit]
+
+        return [
+            DocumentSnapshot(DocumentReference(self, query._collection, doc_id), data, query._fields, updated)
+            for _, doc_id, data, updated in rows
+        ]
+
+    def _after_cursor(self, row, orders, cursor):
+        if isinstance(cursor, DocumentSnapshot):
+            cursor_data = cursor.to_dict() or {}
+            cursor_values = [cursor.id if field == DOCUMENT_ID else cursor_data.get(field) for field, _ in orders]
+        else:
+            cursor_values = []
+            for field, _ in orders:
+                value = cursor.get(field)
+                if field == DOCUMENT_ID and isinstance(value, DocumentReference):
+                    value = value.id
+                cursor_values.append(value)
+
+        for (field, direction), value, bound in zip(orders, row[0], cursor_values):
+            if field == DOCUMENT_ID and bound is None:
+                continue
+            value_key, bound_key = _sort_key(value), _sort_key(bound)
+            if value_key == bound_key:
+                continue
+            return (value_key > bound_key) != (direction == 'DESCENDING')
+        return False
+
+    def _commit(self, writes):
+        touched = set()
+        with self._lock:
+            try:
+                for kind, reference, data, merge, option in writes:
+                    collection, doc_id = reference.parent.id, reference.id
+                    current, updated = self._load_with_time(collection, doc_id)
+
+                    if option is not None and (current is None or updated != option.last_update_time):
+                        raise FailedPrecondition(f'Document changed since it was read: {reference.path}')
+
+                    if kind == 'delete':
+                        self._conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?',
+                                           (collection, doc_id))
+                        touched.add(collection)
+                        continue
+
+                    if kind == 'create' and current is not None:
+                        raise AlreadyExists(f'Document already exists: {reference.path}')
+                    if kind == 'update':
+                        if current is None:
+                            raise NotFound(f'No document to update: {reference.path}')
+                        new_data = current
+                        for field, value in data.items():
+                            _set_path(new_data, field, value)
+                    elif kind == 'set' and merge and current is not None:
+                        new_data = current
+                        _merge(new_data, data)
+                    else:
+                        new_data = _apply_value(None, data)
+
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO documents (collection, id, data, updated) VALUES (?, ?, ?, ?)',
+                        (collection, doc_id, json.dumps(new_data, default=str), max(time.time_ns(), (updated or 0) + 1))
+                    )
+                    touched.add(collection)
+
+                self._conn.commit()
+                self.stats['writes'] += len(writes)
+                self.stats['commits'] += 1
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        self._notify(touched)
+
+    # Snapshot listeners: re-run each affected watch after a commit and
+    # deliver the differences, mirroring Firestore's on_snapshot callbacks
+    def _watch(self, collection, filters, callback):
+        watch = Watch(self, collection, list(filters), callback)
+        with self._lock:
+            self._watches.append(watch)
+        self._deliver(watch)
+        return watch
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, collections):
+        with self._lock:
+            watches = [watch for watch in self._watches if watch.collection in collections]
+        for watch in watches:
+            self._deliver(watch)
+
+    def _deliver(self, watch):
+        with self._lock:
+            current = {doc_id: data for doc_id, data, _ in self._candidates(watch.collection, watch.filters)}
+            previous = watch.results
+            initial = not watch.delivered
+            watch.results = current
+            watch.delivered = True
+
+        def snapshot(doc_id, data):
+            return DocumentSnapshot(DocumentReference(self, watch.collection, doc_id), data)
+
+        changes = []
+        for doc_id, data in current.items():
+            if doc_id not in previous:
+                changes.append(DocumentChange(ChangeType.ADDED, snapshot(doc_id, data)))
+            elif previous[doc_id] != data:
+                changes.append(DocumentChange(ChangeType.MODIFIED, snapshot(doc_id, data)))
+        for doc_id, data in previous.items():
+            if doc_id not in current:
+                changes.append(DocumentChange(ChangeType.REMOVED, snapshot(doc_id, data)))
+
+        if changes or initial:
+            docs = [snapshot(doc_id, data) for doc_id, data in sorted(current.items())]
+            watch.callback(docs, changes, datetime.utcnow())
+
+
+class UserRecord:
+    def __init__(self, uid, email):
+        self.uid = uid
+        self.email = email
+
+# Stand-in for firebase_admin.auth account creation when running locally
+class LocalAuth:
+    def __init__(self, client):
+        self._client = client
+
+    def create_user(self, email, password, **kwargs):
+        accounts = self._client.collection('_Accounts')
+        if any(True for _ in accounts.where('email', '==', email).limit(1).stream()):
+            raise AlreadyExists(f'The user with the provided email already exists ({email})')
+        uid = uuid.uuid4().hex
+        accounts.document(uid).set({'email': email})
+        return UserRecord(uid, email)
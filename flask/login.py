@@ -1,11 +1,14 @@
 import os
 from dotenv import load_dotenv
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
-import requests
+from firebase_config import auth, db
+from user_cache import user_cache
+from user_hydration import get_user
+from http_pool import post_json
+from pagination import DOCUMENT_ID, fetch_page, page_args
+from streaming import stream_items, stream_requested
 
 load_dotenv()
-db, auth = initialize_firebase()
 
 login_routes = Blueprint('login', __name__)
 
@@ -28,21 +31,28 @@ def login():
             "returnSecureToken": True
         }
 
-        response = requests.post(url, json=payload)
+        # Pooled keep-alive session instead of a new connection per login
+        response = post_json(url, payload)
         result = response.json()
 
         if "error" in result:
             return jsonify({"error": result["error"]["message"]}), 401
 
-         # After successful login, look up user data from Firestore
-        user_docs = db.collection('User').where('email', '==', email).stream()
-        user_data = None
-        user_id = None
+        # User docs are keyed by the Firebase uid (localId), so this is a
+        # cached get; the email lookups cover accounts stored under other IDs
+        user_id = result.get("localId")
+        user_data = get_user(user_id)
 
-        for doc in user_docs:
-            user_data = doc.to_dict()
-            user_id = doc.id
-            break  # assuming only one match
+        if not user_data:
+            user_id, user_data = user_cache.get_by_email(email)
+
+        if not user_data:
+            user_docs = db.collection('User').where('email', '==', email).stream()
+            for doc in user_docs:
+                user_data = doc.to_dict()
+                user_id = doc.id
+                user_cache.put(user_id, user_data)
+                break  # assuming only one match
 
         if not user_data:
             return jsonify({'error': 'User not found in Firestore'}), 404
@@ -61,24 +71,51 @@ def login():
 @login_routes.route('/users', methods=['GET'])
 def get_users():
     try:
-        # Fetch all users from Firestore
-        user_docs = db.collection('User').stream()
-        
-        users = []
-        for doc in user_docs:
-            user_data = doc.to_dict()
-            user_id = doc.id
-            users.append({
+        streaming = stream_requested()
+        try:
+            limit, _ = page_args()
+            next_cursor = None
+
+            if limit is None and not request.args.get('fields'):
+                # Fetch all users, reusing the cached directory when it is fresh
+                directory = user_cache.get_listing()
+                if directory is not None:
+                    entries = directory.items()
+                elif streaming:
+                    # Cold cache: stream straight through instead of buffering
+                    entries = ((doc.id, doc.to_dict()) for doc in db.collection('User').stream())
+                else:
+                    directory = {doc.id: doc.to_dict() for doc in db.collection('User').stream()}
+                    user_cache.put_listing(directory)
+                    entries = directory.items()
+            else:
+                # Paged listing reads only the columns this endpoint returns
+                query = db.collection('User').select(['name', 'avatar'])
+                docs, next_cursor = fetch_page(query, [DOCUMENT_ID], required_fields=['name', 'avatar'],
+                                               lazy=streaming)
+                entries = ((doc.id, doc.to_dict()) for doc in docs)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        users = (
+            {
                 'userID': user_id,
                 'username': user_data.get('name'),
                 'avatar': user_data.get('avatar')
-            })
+            }
+            for user_id, user_data in entries
+        )
+
+        if streaming:
+            return stream_items('users', users, next_cursor=next_cursor)
 
-        if not users:
+        users = list(users)
+        if not users and not request.args.get('cursor'):
             return jsonify({'error': 'No users found'}), 404
 
         return jsonify({
-            'users': users
+            'users': users,
+            'nextCursor': next_cursor
         }), 200
 
     except Exception as e:
@@ -0,0 +1,51 @@
+import argparse
+import json
+from agenda import normalize_due_dates
+from comment import reconcile_comment_counts
+from notifications import rebuild_reminders
+from project_stats import reconcile_project_stats
+from search import rebuild_search_index
+from startup import startup_report
+
+# One-shot maintenance commands, e.g. `python manage.py reconcile-comment-counts`
+def run_reconcile_comment_counts(args):
+    updated = reconcile_comment_counts()
+    print(f"Updated commentCount on {updated} task(s)")
+
+def run_reconcile_project_stats(args):
+    rebuilt, removed = reconcile_project_stats()
+    print(f"Rebuilt stats for {rebuilt} project(s), removed {removed} orphaned stats document(s)")
+
+def run_rebuild_search_index(args):
+    indexed, removed = rebuild_search_index()
+    print(f"Indexed {indexed} item(s), removed {removed} stale entry(ies)")
+
+def run_normalize_due_dates(args):
+    updated, unparseable = normalize_due_dates()
+    print(f"Normalized due dates on {updated} item(s); {unparseable} could not be parsed")
+
+def run_rebuild_reminders(args):
+    scheduled = rebuild_reminders()
+    print(f"Scheduled reminders for {scheduled} item(s)")
+
+def run_startup_report(args):
+    print(json.dumps(startup_report(top=args.top), indent=2))
+
+COMMANDS = {
+    'reconcile-comment-counts': run_reconcile_comment_counts,
+    'reconcile-project-stats': run_reconcile_project_stats,
+    'rebuild-search-index': run_rebuild_search_index,
+    'normalize-due-dates': run_normalize_due_dates,
+    'rebuild-reminders': run_rebuild_reminders,
+    'startup-report': run_startup_report,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintenance commands for the task management backend')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--top', type=int, default=15, help='modules listed by startup-report')
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from flask import Blueprint, Response, g, request
+from instrumentation import end_request_stats, start_request_stats
+
+metrics_routes = Blueprint('metrics', __name__)
+
+# Requests making more storage RPCs than this are flagged in the logs, the
+# X-RPC-Budget header and rpc_budget_exceeded_total
+RPC_BUDGET = int(os.getenv('RPC_BUDGET', '20'))
+REQUEST_LOGS = os.getenv('REQUEST_LOGS', '1') not in ('0', 'false', 'no')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RPC_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Stats (user_cache, reminders) that only ever grow; the rest are exported as gauges
+COUNTER_STATS = ('hits', 'misses', 'evictions', 'Claimed', 'Skipped', 'Sent')
+
+# Under gunicorn every worker process has its own registry and a scrape
+# reaches whichever worker accepts it. With METRICS_DIR set (gunicorn.conf.py
+# does) each worker writes a snapshot of its metrics there every
+# METRICS_WRITE_SECONDS and when scraped, and /metrics serves the sum over
+# all snapshots, those of exited workers included, so counters never go
+# backwards. Gauges are reported per live worker with a pid label.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_WRITE_SECONDS = float(os.getenv('METRICS_WRITE_SECONDS', '5'))
+
+logger = logging.getLogger('api.requests')
+snapshot_logger = logging.getLogger(__name__)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+# Registry fields holding counters and histograms (with their buckets)
+COUNTER_FIELDS = ('requests', 'calls', 'call_seconds', 'documents', 'budget_exceeded')
+HISTOGRAM_FIELDS = {'latency': LATENCY_BUCKETS, 'rpcs': RPC_BUCKETS}
+
+# Process-local metrics keyed by label tuples; rendered in the Prometheus
+# text exposition format by /metrics
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.latency = {}
+            self.rpcs = {}
+            self.calls = {}
+            self.call_seconds = {}
+            self.documents = {}
+            self.budget_exceeded = {}
+
+    def observe_request(self, blueprint, route, method, status, seconds, stats):
+        labels = (blueprint, route, method)
+        with self._lock:
+            key = labels + (str(status),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(labels, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.rpcs.setdefault(labels, Histogram(RPC_BUCKETS)).observe(stats.rpcs)
+            for kind, (count, total) in stats.calls.items():
+                key = labels + (kind,)
+                self.calls[key] = self.calls.get(key, 0) + count
+                self.call_seconds[key] = self.call_seconds.get(key, 0.0) + total
+            for kind, count in (('read', stats.reads), ('write', stats.writes)):
+                key = labels + (kind,)
+                self.documents[key] = self.documents.get(key, 0) + count
+            if stats.rpcs > RPC_BUDGET:
+                self.budget_exceeded[labels] = self.budget_exceeded.get(labels, 0) + 1
+
+    # The metrics as JSON-safe data, for merge() in another process
+    def snapshot(self):
+        with self._lock:
+            data = {name: [[list(labels), value] for labels, value in getattr(self, name).items()]
+                    for name in COUNTER_FIELDS}
+            for name in HISTOGRAM_FIELDS:
+                data[name] = [[list(labels), hist.counts, hist.total, hist.sum]
+                              for labels, hist in getattr(self, name).items()]
+            return data
+
+    # Add another registry's snapshot() to this one
+    def merge(self, data):
+        with self._lock:
+            for name in COUNTER_FIELDS:
+                values = getattr(self, name)
+                for labels, value in data.get(name, []):
+                    values[tuple(labels)] = values.get(tuple(labels), 0) + value
+            for name, buckets in HISTOGRAM_FIELDS.items():
+                values = getattr(self, name)
+                for labels, counts, total, total_sum in data.get(name, []):
+                    hist = values.setdefault(tuple(labels), Histogram(buckets))
+                    hist.counts = [mine + theirs for mine, theirs in zip(hist.counts, counts)]
+                    hist.total += total
+                    hist.sum += total_sum
+
+    def render(self):
+        lines = []
+        base = ('blueprint', 'route', 'method')
+
+        def counter(name, help_text, values, names):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(values.items()):
+                lines.append(f'{name}{{{_labels(names, labels)}}} {value}')
+
+        def histogram(name, help_text, values):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, hist in sorted(values.items()):
+                label_text = _labels(base, labels)
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {hist.total}')
+                lines.append(f'{name}_sum{{{label_text}}} {hist.sum}')
+                lines.append(f'{name}_count{{{label_text}}} {hist.total}')
+
+        with self._lock:
+            counter('http_requests_total', 'Requests served.', self.requests, base + ('status',))
+            histogram('http_request_duration_seconds', 'Request latency.', self.latency)
+            histogram('firestore_rpcs_per_request', 'Storage RPCs made per request.', self.rpcs)
+            counter('firestore_calls_total', 'Storage RPCs by call type.', self.calls, base + ('call',))
+            counter('firestore_call_seconds_total', 'Time spent waiting on storage RPCs.',
+                    self.call_seconds, base + ('call',))
+            counter('firestore_documents_total', 'Documents read or written.', self.documents, base + ('op',))
+            counter('rpc_budget_exceeded_total', f'Requests over the {RPC_BUDGET} RPC budget.',
+                    self.budget_exceeded, base)
+
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+registry = MetricsRegistry()
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return request.blueprint or 'app', rule, request.method
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.request_stats, g.request_stats_token = start_request_stats()
+
+def _after_request(response):
+    stats = g.get('request_stats')
+    if stats is None:
+        return response
+
+    # Streamed bodies keep reading after this point; their final numbers
+    # only reach the logs and /metrics, once the response is closed
+    elapsed_ms = (time.perf_counter() - g.request_started) * 1000
+    timings = [f'storage;desc="{stats.rpcs} RPCs";dur={stats.storage_seconds * 1000:.1f}']
+    timings += [f'{kind};desc="{count} calls";dur={total * 1000:.1f}' for kind, (count, total) in stats.calls.items()]
+    timings.append(f'total;dur={elapsed_ms:.1f}')
+    response.headers['Server-Timing'] = ', '.join(timings)
+    response.headers['X-RPC-Count'] = str(stats.rpcs)
+    if stats.rpcs > RPC_BUDGET:
+        response.headers['X-RPC-Budget'] = f'exceeded ({stats.rpcs}/{RPC_BUDGET})'
+
+    g.response_status = response.status_code
+    if response.is_streamed:
+        finish = _finisher()
+        response.call_on_close(finish)
+    return response
+
+# Bind everything needed to record the request, so it can also run after the
+# request context is gone. Only the first call records anything.
+def _finisher():
+    stats = g.pop('request_stats')
+    token = g.request_stats_token
+    started = g.request_started
+    status = g.get('response_status', 500)
+    blueprint, route, method = _route_labels()
+
+    def finish():
+        try:
+            end_request_stats(token)
+        except (ValueError, RuntimeError):
+            pass
+        _record_request(blueprint, route, method, status, time.perf_counter() - started, stats)
+
+    return finish
+
+def _teardown_request(exc):
+    if g.get('request_stats') is not None:
+        _finisher()()
+
+def _record_request(blueprint, route, method, status, seconds, stats):
+    registry.observe_request(blueprint, route, method, status, seconds, stats)
+    if not REQUEST_LOGS:
+        return
+
+    exceeded = stats.rpcs > RPC_BUDGET
+    entry = {
+        'event': 'request',
+        'blueprint': blueprint,
+        'route': route,
+        'method': method,
+        'status': status,
+        'durationMs': round(seconds * 1000, 3),
+        **stats.to_dict(),
+        'rpcBudget': RPC_BUDGET,
+        'budgetExceeded': exceeded
+    }
+    logger.log(logging.WARNING if exceeded else logging.INFO, json.dumps(entry))
+
+# Wire per-request storage accounting, Server-Timing headers and request logs
+# into an app
+def init_metrics(app):
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.register_blueprint(metrics_routes)
+
+# This process's user_cache, realtime and reminder stats as (name, value)
+def _process_stats():
+    from notifications import reminder_worker
+    from realtime import hub
+    from user_cache import user_cache
+
+    values = [('user_cache_' + key, value) for key, value in user_cache.stats().items()]
+    values += [('realtime_' + key, value) for key, value in hub.stats().items()]
+    values += list(reminder_worker.stats().items())
+    return values
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f'{pid}.json')
+
+# Write this worker's snapshot for the other workers' /metrics
+def write_snapshot():
+    if not METRICS_DIR:
+        return
+    path = _snapshot_path(os.getpid())
+    with open(path + '.tmp', 'w') as snapshot_file:
+        json.dump({'pid': os.getpid(), 'registry': registry.snapshot(), 'stats': _process_stats()}, snapshot_file)
+    os.replace(path + '.tmp', path)
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SnapshotWriter:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if METRICS_DIR and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+            self._thread.start()
+
+    # Stop writing periodically and write one last snapshot
+    def stop(self):
+        self._stop.set()
+        try:
+            write_snapshot()
+        except Exception:
+            snapshot_logger.exception('Could not write metrics snapshot')
+
+    def _run(self):
+        while not self._stop.wait(METRICS_WRITE_SECONDS):
+            try:
+                write_snapshot()
+            except Exception:
+                snapshot_logger.exception('Could not write metrics snapshot')
+
+snapshot_writer = SnapshotWriter()
+
+def _stats_lines(processes):
+    lines = []
+    counters = {}
+    gauges = {}
+    for pid, values in processes:
+        for name, value in values:
+            metric = ''.join('_' + char.lower() if char.isupper() else char for char in name)
+            if name.endswith(COUNTER_STATS):
+                counters[metric] = counters.get(metric, 0) + value
+            else:
+                gauges.setdefault(metric, []).append((pid, value))
+    for metric, value in counters.items():
+        lines.append(f'# TYPE {metric}_total counter\n{metric}_total {value}\n')
+    for metric, values in gauges.items():
+        lines.append(f'# TYPE {metric} gauge\n')
+        for pid, value in values:
+            lines.append(f'{metric}{{pid="{pid}"}} {value}\n' if pid else f'{metric} {value}\n')
+    return lines
+
+@metrics_routes.route('/metrics', methods=['GET'])
+def metrics():
+    if not METRICS_DIR:
+        lines = [registry.render()] + _stats_lines([(None, _process_stats())])
+        return Response(''.join(lines), mimetype='text/plain; version=0.0.4')
+
+    write_snapshot()
+    merged = MetricsRegistry()
+    processes = []
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        try:
+            with open(path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            continue
+        merged.merge(snapshot['registry'])
+        alive = _is_alive(snapshot['pid'])
+        # Exited workers still count towards the counters, not the gauges
+        processes.append((snapshot['pid'], [(name, value) for name, value in snapshot['stats']
+                                            if alive or name.endswith(COUNTER_STATS)]))
+
+    lines = [merged.render()] + _stats_lines(processes)
+    return Response(''.join(lines), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,282 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from firebase_config import db
+from batch_writer import BatchWriter
+from dates import DONE_STATUSES, DUE_DATE_FORMAT, normalize_due_date
+from pagination import DESCENDING, DOCUMENT_ID, fetch_page
+from storage import already_exists_error, get_documents, precondition_failed_error, unchanged_since
+
+notification_routes = Blueprint('notifications', __name__)
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_COLLECTION = 'Notifications'
+
+# The reminder queue: one Reminders document per item and lead time, written
+# or deleted in the same batch as the item itself, so every worker sees the
+# same queue. Workers poll for documents whose fireAt has passed and claim
+# each one by deleting it only if it is unchanged since they read it; the
+# single worker whose delete succeeds delivers it. Needs a single-field
+# index on fireAt (Firestore's default).
+REMINDERS_COLLECTION = 'Reminders'
+
+# Reminders go out this many hours before a due date/deadline
+REMINDER_LEAD_HOURS = sorted(
+    (float(hours) for hours in os.getenv('REMINDER_LEAD_HOURS', '24,1').split(',') if hours.strip()),
+    reverse=True
+)
+# Every worker can poll safely (claims are exclusive); NOTIFICATION_SCHEDULER=0
+# turns polling off, e.g. for a deployment that only serves reads
+NOTIFICATION_SCHEDULER = os.getenv('NOTIFICATION_SCHEDULER', '1') not in ('0', 'false', 'no')
+REMINDER_POLL_SECONDS = float(os.getenv('REMINDER_POLL_SECONDS', '30'))
+# Due reminders claimed per poll
+REMINDER_BATCH_SIZE = 100
+
+# Where each kind keeps its due date
+DUE_FIELDS = {'task': 'dueDate', 'subtask': 'dueDate', 'project': 'deadline'}
+COLLECTIONS = {'task': 'Tasks', 'subtask': 'Subtasks', 'project': 'Project'}
+
+def _recipients(kind, data):
+    if kind == 'project':
+        return list(data.get('members') or [])
+    return [data['assignedTo']] if data.get('assignedTo') else []
+
+def _reminder_ref(kind, item_id, lead_hours):
+    return db.collection(REMINDERS_COLLECTION).document(f'{kind}_{item_id}_{lead_hours:g}')
+
+# Notification IDs are derived from what they announce, so a reminder that
+# is delivered twice is only ever stored once
+def notification_id(user_id, kind, item_id, due_date, lead_hours):
+    raw = f'{user_id}|{kind}|{item_id}|{due_date}|{lead_hours}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+# The normalized due date reminders should be sent for, or None when the item
+# is closed, undated or already due
+def _due_date(kind, data, now):
+    if data.get('status') in DONE_STATUSES:
+        return None
+    try:
+        due_date = normalize_due_date(data.get(DUE_FIELDS[kind]))
+    except ValueError:
+        return None
+    if not due_date or datetime.strptime(due_date, DUE_DATE_FORMAT) <= now:
+        return None
+    return due_date
+
+# True when an update touches a field that decides an item's reminders
+def affects_reminders(kind, update_data):
+    return any(field in update_data for field in (DUE_FIELDS[kind], 'status'))
+
+# Queue an item's Reminders documents on a batch/BatchWriter, replacing any
+# earlier ones. Of the lead times already passed only the closest one is
+# kept, so an item due in 30 minutes gets a single reminder.
+def schedule_reminders(batch, kind, item_id, data):
+    now = datetime.utcnow()
+    due_date = _due_date(kind, data, now)
+    due_at = datetime.strptime(due_date, DUE_DATE_FORMAT) if due_date else None
+
+    for index, lead_hours in enumerate(REMINDER_LEAD_HOURS):
+        ref = _reminder_ref(kind, item_id, lead_hours)
+        if due_at is None:
+            batch.delete(ref)
+            continue
+        fire_at = due_at - timedelta(hours=lead_hours)
+        later = REMINDER_LEAD_HOURS[index + 1:]
+        if fire_at <= now and later and due_at - timedelta(hours=later[0]) <= now:
+            batch.delete(ref)
+            continue
+        batch.set(ref, {
+            'kind': kind,
+            'itemID': item_id,
+            'leadHours': lead_hours,
+            'dueDate': due_date,
+            'fireAt': fire_at.strftime(DUE_DATE_FORMAT)
+        })
+
+def cancel_reminders(batch, kind, item_id):
+    for lead_hours in REMINDER_LEAD_HOURS:
+        batch.delete(_reminder_ref(kind, item_id, lead_hours))
+
+# Polls the Reminders queue on a background thread and delivers what is due
+class ReminderWorker:
+    def __init__(self, poll_seconds=REMINDER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.claimed = 0
+        self.skipped = 0
+        self.sent = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='reminder-worker', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {'remindersClaimed': self.claimed, 'remindersSkipped': self.skipped,
+                    'notificationsSent': self.sent}
+
+    def _count(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Polling the reminder queue failed')
+            self._stop.wait(self.poll_seconds)
+
+    # Claim and deliver the reminders due by now. Returns how many were claimed.
+    def poll(self):
+        now = datetime.utcnow().strftime(DUE_DATE_FORMAT)
+        query = (db.collection(REMINDERS_COLLECTION)
+                 .where('fireAt', '<=', now)
+                 .order_by('fireAt')
+                 .limit(REMINDER_BATCH_SIZE))
+        conflict = precondition_failed_error()
+
+        claimed = 0
+        for reminder_doc in query.stream():
+            if self._stop.is_set():
+                break
+            try:
+                # Only one worker's delete goes through; the others see a
+                # changed (deleted or rescheduled) document
+                reminder_doc.reference.delete(option=unchanged_since(reminder_doc))
+            except conflict:
+                continue
+            claimed += 1
+            self._count('claimed')
+            try:
+                self._deliver(reminder_doc.to_dict())
+            except Exception:
+                logger.exception('Delivering reminder %s failed', reminder_doc.id)
+        return claimed
+
+    # The item is read again so a reminder queued before an update or delete
+    # never goes out for the old due date, status or assignee
+    def _deliver(self, reminder):
+        kind, item_id, lead_hours = reminder['kind'], reminder['itemID'], reminder['leadHours']
+        item_doc = db.collection(COLLECTIONS[kind]).document(item_id).get()
+        item = item_doc.to_dict() if item_doc.exists else None
+        if item is None or item.get('status') in DONE_STATUSES:
+            self._count('skipped')
+            return
+        try:
+            due_date = normalize_due_date(item.get(DUE_FIELDS[kind]))
+        except ValueError:
+            due_date = None
+        if due_date != reminder['dueDate']:
+            self._count('skipped')
+            return
+
+        already_exists = already_exists_error()
+        now = datetime.utcnow()
+        # A reminder queued late (the item was created inside the lead time)
+        # still says how long is actually left
+        hours_left = (datetime.strptime(due_date, DUE_DATE_FORMAT) - now).total_seconds() / 3600
+        due_in = f'{hours_left:.0f} hour(s)' if hours_left >= 1 else 'less than an hour'
+        for user_id in _recipients(kind, item):
+            doc_id = notification_id(user_id, kind, item_id, due_date, lead_hours)
+            try:
+                db.collection(NOTIFICATIONS_COLLECTION).document(doc_id).create({
+                    'notificationID': doc_id,
+                    'userID': user_id,
+                    'type': 'deadline_reminder',
+                    'kind': kind,
+                    'itemID': item_id,
+                    'projectID': item.get('projectID') if kind != 'project' else item_id,
+                    'taskID': item.get('taskID'),
+                    'title': item.get('title'),
+                    'dueDate': due_date,
+                    'leadHours': lead_hours,
+                    'message': f"{kind.capitalize()} '{item.get('title')}' is due in {due_in}",
+                    'read': False,
+                    'createdAt': now.isoformat()
+                })
+                self._count('sent')
+            except already_exists:
+                continue
+
+
+reminder_worker = ReminderWorker()
+
+def start_reminder_worker():
+    if NOTIFICATION_SCHEDULER:
+        reminder_worker.start()
+
+# Write the Reminders documents for every open item due from now on, e.g.
+# after deploying the queue or changing REMINDER_LEAD_HOURS. Returns how
+# many items were scheduled.
+def rebuild_reminders():
+    now = datetime.utcnow().strftime(DUE_DATE_FORMAT)
+    scheduled = 0
+    with BatchWriter(db) as writer:
+        for kind, collection in COLLECTIONS.items():
+            for doc in db.collection(collection).where(DUE_FIELDS[kind], '>=', now).stream():
+                schedule_reminders(writer, kind, doc.id, doc.to_dict())
+                scheduled += 1
+    return scheduled
+
+@notification_routes.route('/notifications', methods=['GET'])
+def get_notifications():
+    try:
+        user_id = request.args.get('userID')
+        if not user_id:
+            return jsonify({'error': 'userID is required'}), 400
+
+        # Newest first; needs a composite index on userID (+ read) + createdAt
+        query = db.collection(NOTIFICATIONS_COLLECTION).where('userID', '==', user_id)
+        if request.args.get('unread') in ('1', 'true'):
+            query = query.where('read', '==', False)
+
+        try:
+            docs, next_cursor = fetch_page(query, ['createdAt', DOCUMENT_ID], required_fields=['notificationID'],
+                                           direction=DESCENDING)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        notifications = [doc.to_dict() for doc in docs]
+        return jsonify({'notifications': notifications, 'nextCursor': next_cursor}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@notification_routes.route('/notifications/mark_read', methods=['POST'])
+def mark_notifications_read():
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('userID')
+        notification_ids = data.get('notificationIDs') or []
+
+        if not user_id or not isinstance(notification_ids, list):
+            return jsonify({'error': 'userID and a notificationIDs array are required'}), 400
+
+        refs = [db.collection(NOTIFICATIONS_COLLECTION).document(doc_id) for doc_id in notification_ids]
+        docs = get_documents(refs).values()
+
+        updated = 0
+        with BatchWriter(db) as writer:
+            for doc in docs:
+                if doc.exists and doc.to_dict().get('userID') == user_id:
+                    writer.update(doc.reference, {'read': True})
+                    updated += 1
+
+        return jsonify({'message': 'Notifications updated', 'updated': updated}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,99 @@
+import base64
+import json
+from flask import request
+
+# Firestore's special field path for ordering by document ID
+DOCUMENT_ID = '__name__'
+
+MAX_PAGE_SIZE = 500
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+# Read ?limit= and ?cursor= from the request; limit is None when the caller
+# wants the full (unpaginated) listing
+def page_args():
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    if cursor and limit is None:
+        raise ValueError('cursor requires limit')
+
+    return limit, cursor
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
+
+# Fetch one page of a query ordered by order_fields (the last of which must be
+# unique, e.g. DOCUMENT_ID). Returns the page's documents and the cursor for
+# the next page, or None when there is nothing left.
+def paginate(query, order_fields, limit, cursor=None, direction=ASCENDING):
+    for field in order_fields:
+        query = query.order_by(field, direction=direction)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if any(field not in values for field in order_fields):
+            raise ValueError('Invalid cursor')
+        query = query.start_after({field: values[field] for field in order_fields})
+
+    docs = list(query.limit(limit + 1).stream())
+    if len(docs) <= limit:
+        return docs, None
+
+    docs = docs[:limit]
+    last_doc = docs[-1]
+    last_data = last_doc.to_dict()
+    next_cursor = encode_cursor({
+        field: last_doc.id if field == DOCUMENT_ID else last_data.get(field)
+        for field in order_fields
+    })
+    return docs, next_cursor
+
+# Read ?fields= as a Firestore select() projection. Fields the handler needs
+# (IDs, hydration keys, sort keys) are always included. None means all fields.
+def field_args(required_fields=()):
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    return list(dict.fromkeys(list(required_fields) + fields))
+
+# Apply the request's projection and pagination to a list query. Returns the
+# documents and the next cursor (None on the last page or when unpaginated).
+# With lazy=True an unpaginated listing is returned as the live stream
+# iterator rather than a list. direction applies to every order field.
+def fetch_page(query, order_fields, required_fields=(), lazy=False, direction=ASCENDING):
+    limit, cursor = page_args()
+    sort_fields = [field for field in order_fields if field != DOCUMENT_ID]
+    fields = field_args(list(required_fields) + sort_fields)
+    if fields:
+        query = query.select(fields)
+
+    if limit is None:
+        for field in order_fields:
+            query = query.order_by(field, direction=direction)
+        docs = query.stream()
+        return (docs if lazy else list(docs)), None
+
+    return paginate(query, order_fields, limit, cursor, direction)
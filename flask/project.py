@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
-from firebase_admin import firestore
+from firebase_config import db
+from user_hydration import fetch_users, member_profiles
+from user_cache import user_cache
+from pagination import DOCUMENT_ID, fetch_page
+from streaming import stream_items, stream_requested
+from fanout import run_parallel
+from batch_writer import BatchWriter
+from cascade import delete_project_cascade
+from project_versions import bump_project_version, etag_matches, not_modified, project_etag, with_etag
+from storage import ArrayRemove, ArrayUnion
+from dates import normalize_due_date
+from notifications import affects_reminders, schedule_reminders
+from project_stats import init_stats
 import uuid
 from datetime import datetime
 
-db, _ = initialize_firebase()
 project_routes = Blueprint('project', __name__)
 
 @project_routes.route('/create_project', methods=['POST'])
@@ -19,16 +29,16 @@ def create_project():
         if not title or not owner_id:
             return jsonify({'error': 'Project title and ownerID are required'}), 400
 
-        # Validate member IDs
-        valid_member_ids = []
-        invalid_member_ids = []
+        try:
+            deadline = normalize_due_date(data.get('deadline'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        for member_id in members:
-            user_doc = db.collection('User').document(member_id).get()
-            if user_doc.exists:
-                valid_member_ids.append(member_id)
-            else:
-                invalid_member_ids.append(member_id)
+        # Validate member IDs (the owner is fetched too so we know whether
+        # their User document can be updated)
+        known_users = fetch_users(members + [owner_id])
+        valid_member_ids = [member_id for member_id in members if member_id in known_users]
+        invalid_member_ids = [member_id for member_id in members if member_id not in known_users]
 
         if invalid_member_ids:
             return jsonify({
@@ -43,29 +53,31 @@ def create_project():
         if owner_id not in valid_member_ids:
             valid_member_ids.append(owner_id)
 
-        # Save to Firestore
-        db.collection('Project').document(project_id).set({
+        # Save the project and every member's "projects" field in one batch
+        project_data = {
             'projectID': project_id,
             'title': title,
             'description': description,
             'ownerID': owner_id,
             'members': valid_member_ids,
-            'deadline': data.get('deadline'),
+            'deadline': deadline,
             'createdAt': datetime.utcnow().isoformat()
-        })
+        }
+        with BatchWriter(db) as writer:
+            writer.set(db.collection('Project').document(project_id), project_data)
+            init_stats(writer, project_id)
+            schedule_reminders(writer, 'project', project_id, project_data)
+            bump_project_version(writer, project_id)
+
+            for member_id in valid_member_ids:
+                if member_id in known_users:
+                    writer.update(db.collection('User').document(member_id),
+                                  {'projects': ArrayUnion([project_id])})
 
         print("Received deadline:", data.get('deadline'))
 
-        # Update each user's "projects" field
-        for member_id in valid_member_ids:
-            user_ref = db.collection('User').document(member_id)
-            user_doc = user_ref.get()
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                existing_projects = user_data.get('projects', [])
-                if project_id not in existing_projects:
-                    existing_projects.append(project_id)
-                    user_ref.update({'projects': existing_projects})
+        # Members' cached User documents now have a stale projects list
+        user_cache.invalidate(*valid_member_ids)
 
         return jsonify({"message": "Project created successfully!", "projectID": project_id}), 201
 
@@ -80,6 +92,10 @@ def get_projects():
 
         # Case 1: Get project by projectID
         if project_id:
+            etag = project_etag(project_id)
+            if etag_matches(etag):
+                return not_modified(etag)
+
             project_ref = db.collection('Project').document(project_id)
             project_doc = project_ref.get()
 
@@ -88,35 +104,32 @@ def get_projects():
 
             project_data = project_doc.to_dict()
 
-            # Fetch member profiles with avatar
-            member_profiles = []
-            for member_id in project_data.get('members', []):
-                user_doc = db.collection('User').document(member_id).get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
-                    member_profiles.append({
-                        'userID': member_id,
-                        'name': user_data.get('name'),
-                        'avatar': user_data.get('avatar')
-                    })
-
-            return jsonify({
+            # Fetch member profiles with avatar in one batched read
+            return with_etag(jsonify({
                 'project': project_data,
-                'memberProfiles': member_profiles
-            }), 200
+                'memberProfiles': member_profiles(project_data.get('members', []))
+            }), etag), 200
 
         # Case 2: Get all projects for a specific user
         if user_id:
-            projects_ref = db.collection('Project')
-            all_projects = projects_ref.stream()
+            # The owner is always in members, so one indexed array_contains
+            # query covers both owned and shared projects
+            query = db.collection('Project').where('members', 'array_contains', user_id)
+
+            streaming = stream_requested()
+            try:
+                docs, next_cursor = fetch_page(query, [DOCUMENT_ID], required_fields=['projectID'],
+                                               lazy=streaming)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
-            user_projects = []
-            for doc in all_projects:
-                project_data = doc.to_dict()
-                if project_data.get('ownerID') == user_id or user_id in project_data.get('members', []):
-                    user_projects.append(project_data)
+            if streaming:
+                return stream_items('projects', (doc.to_dict() for doc in docs), next_cursor=next_cursor)
 
-            return jsonify({'projects': user_projects}), 200
+            return jsonify({
+                'projects': [doc.to_dict() for doc in docs],
+                'nextCursor': next_cursor
+            }), 200
 
         return jsonify({'error': 'Provide either projectID or userID'}), 400
 
@@ -133,7 +146,12 @@ def update_project():
             return jsonify({'error': 'projectID is required'}), 400
 
         project_ref = db.collection('Project').document(project_id)
-        project_doc = project_ref.get()
+
+        # Read the project and validate any new members concurrently
+        project_doc, known_users = run_parallel(
+            lambda: project_ref.get(),
+            lambda: fetch_users(data.get('members') or [])
+        )
 
         if not project_doc.exists:
             return jsonify({'error': 'Project not found'}), 404
@@ -146,17 +164,18 @@ def update_project():
             if field in data:
                 update_data[field] = data[field]
 
+        if 'deadline' in update_data:
+            try:
+                update_data['deadline'] = normalize_due_date(update_data['deadline'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
         # Validate and update members if provided
+        added_member_ids = []
+        removed_member_ids = []
         if 'members' in update_data:
-            valid_member_ids = []
-            invalid_member_ids = []
-
-            for member_id in update_data['members']:
-                user_doc = db.collection('User').document(member_id).get()
-                if user_doc.exists:
-                    valid_member_ids.append(member_id)
-                else:
-                    invalid_member_ids.append(member_id)
+            valid_member_ids = [member_id for member_id in update_data['members'] if member_id in known_users]
+            invalid_member_ids = [member_id for member_id in update_data['members'] if member_id not in known_users]
 
             if invalid_member_ids:
                 return jsonify({
@@ -171,26 +190,56 @@ def update_project():
 
             update_data['members'] = valid_member_ids
 
-        # Perform the update
-        project_ref.update(update_data)
-
-        # Optionally, update each user's 'projects' list (only if members changed)
-        if 'members' in update_data:
-            for member_id in update_data['members']:
-                user_ref = db.collection('User').document(member_id)
-                user_doc = user_ref.get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
-                    existing_projects = user_data.get('projects', [])
-                    if project_id not in existing_projects:
-                        existing_projects.append(project_id)
-                        user_ref.update({'projects': existing_projects})
+            previous_member_ids = project_doc.to_dict().get('members', [])
+            added_member_ids = [member_id for member_id in valid_member_ids if member_id not in previous_member_ids]
+            removed_member_ids = [member_id for member_id in previous_member_ids if member_id not in valid_member_ids]
+
+            # Only touch User documents that still exist (cached lookups)
+            existing_users = fetch_users(added_member_ids + removed_member_ids)
+            added_member_ids = [member_id for member_id in added_member_ids if member_id in existing_users]
+            removed_member_ids = [member_id for member_id in removed_member_ids if member_id in existing_users]
+
+        # Update the project and the affected users' 'projects' lists in one batch
+        with BatchWriter(db) as writer:
+            writer.update(project_ref, update_data)
+            if affects_reminders('project', update_data):
+                schedule_reminders(writer, 'project', project_id, {**project_doc.to_dict(), **update_data})
+            bump_project_version(writer, project_id)
+            for member_id in added_member_ids:
+                writer.update(db.collection('User').document(member_id),
+                              {'projects': ArrayUnion([project_id])})
+            for member_id in removed_member_ids:
+                writer.update(db.collection('User').document(member_id),
+                              {'projects': ArrayRemove([project_id])})
+
+        user_cache.invalidate(*added_member_ids, *removed_member_ids)
 
         return jsonify({'message': 'Project updated successfully!'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@project_routes.route('/delete_project/<project_id>', methods=['DELETE'])
+def delete_project(project_id):
+    try:
+        project_doc = db.collection('Project').document(project_id).get()
+        if not project_doc.exists:
+            return jsonify({'error': 'Project not found'}), 404
+
+        # Tasks, their subtasks/comments and members' project links go too
+        background = request.args.get('background') in ('1', 'true')
+        job = delete_project_cascade(project_id, project_doc.to_dict(), background=background)
+
+        if background:
+            return jsonify({'message': 'Project deletion started', 'job': job.to_dict()}), 202
+        if job.status == 'failed':
+            return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+
+        return jsonify({'message': 'Project deleted successfully', 'job': job.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @project_routes.route('/get_project_overview', methods=['GET'])
 def get_project_overview():
     try:
@@ -199,6 +248,10 @@ def get_project_overview():
         if not project_id:
             return jsonify({'error': 'projectID is required'}), 400
 
+        etag = project_etag(project_id)
+        if etag_matches(etag):
+            return not_modified(etag)
+
         project_doc = db.collection('Project').document(project_id).get()
         if not project_doc.exists:
             return jsonify({'error': 'Project not found'}), 404
@@ -211,17 +264,13 @@ def get_project_overview():
 
         for task_doc in tasks_query:
             task_data = task_doc.to_dict()
-            task_id = task_data['taskID']
-
-            # Count comments for this task
-            comment_query = db.collection('Comments').where('taskID', '==', task_id).stream()
-            comment_count = sum(1 for _ in comment_query)
 
+            # commentCount is maintained on the task by add_comment
             tasks.append({
-                'taskID': task_id,
+                'taskID': task_data['taskID'],
                 'title': task_data.get('title'),
                 'dueDate': task_data.get('dueDate'),
-                'commentCount': comment_count
+                'commentCount': task_data.get('commentCount', 0)
             })
 
         result = {
@@ -233,7 +282,7 @@ def get_project_overview():
             'tasks': tasks
         }
 
-        return jsonify(result), 200
+        return with_etag(jsonify(result), etag), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,186 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from flask import Blueprint, jsonify
+from firebase_config import db
+from batch_writer import BatchWriter
+from storage import Increment
+from dates import DONE_STATUSES
+
+project_stats_routes = Blueprint('project_stats', __name__)
+
+logger = logging.getLogger(__name__)
+
+# One ProjectStats document per project, kept in step with its tasks and
+# subtasks by the write handlers: each write adds the item's new counts and
+# subtracts its old ones as Increment transforms in the same batch. Open items
+# are also counted per assignee and per due day, so overdue counts are worked
+# out when the document is read rather than needing a timer. Overdue is
+# therefore counted by day: an item is overdue from the day after its due
+# date, not from its due time.
+#
+# Increments leave counters that drop to zero in the document (a bucket per
+# past due day, former assignees), so it grows until the next
+# reconcile-project-stats, which rewrites it without them.
+STATS_COLLECTION = 'ProjectStats'
+
+# The fields the rollups are computed from
+STATS_FIELDS = ['status', 'priority', 'assignedTo', 'dueDate']
+
+GROUPS = {'task': 'tasks', 'subtask': 'subtasks'}
+
+# Handlers commit an item's write (and its stats diff) only while the item is
+# unchanged since they read it, re-reading up to this many times on conflict
+COMMIT_ATTEMPTS = 3
+
+def _key(value):
+    return str(value) if value not in (None, '') else 'None'
+
+# The counters one task or subtask adds to, as paths into the document
+def _paths(kind, data):
+    group = GROUPS[kind]
+    paths = [
+        (group, 'total'),
+        (group, 'byStatus', _key(data.get('status'))),
+        (group, 'byPriority', _key(data.get('priority')))
+    ]
+    if data.get('status') not in DONE_STATUSES:
+        paths.append((group, 'open'))
+        if data.get('assignedTo'):
+            paths.append(('assignees', data['assignedTo'], group))
+        if data.get('dueDate'):
+            paths.append(('dueBuckets', group, str(data['dueDate'])[:10]))
+    return paths
+
+# Counter changes for an item going from old to new (None for a create/delete).
+# Changes for several items of the same project can be summed with update().
+def stats_changes(kind, old=None, new=None):
+    changes = Counter()
+    if old:
+        changes.subtract(_paths(kind, old))
+    if new:
+        changes.update(_paths(kind, new))
+    return changes
+
+def _nested(changes, wrap):
+    document = {}
+    for path, delta in changes.items():
+        if not delta:
+            continue
+        target = document
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = wrap(delta)
+    return document
+
+def empty_stats(project_id):
+    return {
+        'projectID': project_id,
+        'tasks': {'total': 0, 'open': 0, 'byStatus': {}, 'byPriority': {}},
+        'subtasks': {'total': 0, 'open': 0, 'byStatus': {}, 'byPriority': {}},
+        'assignees': {},
+        'dueBuckets': {'tasks': {}, 'subtasks': {}},
+        'updatedAt': datetime.utcnow().isoformat()
+    }
+
+# Queue the project's new empty stats document on a batch/BatchWriter
+def init_stats(batch, project_id):
+    batch.set(db.collection(STATS_COLLECTION).document(project_id), empty_stats(project_id))
+
+# Queue stats_changes() for a project on a batch/BatchWriter; a no-op when
+# nothing counted changed
+def apply_stats(batch, project_id, changes):
+    update_data = _nested(changes, Increment)
+    if not project_id or not update_data:
+        return
+    update_data['updatedAt'] = datetime.utcnow().isoformat()
+    batch.set(db.collection(STATS_COLLECTION).document(project_id), update_data, merge=True)
+
+def delete_stats(batch, project_id):
+    batch.delete(db.collection(STATS_COLLECTION).document(project_id))
+
+# Dotted paths of counters below zero, which only drift can produce
+def _negative_counters(value, path=''):
+    if isinstance(value, dict):
+        negative = []
+        for key, item in value.items():
+            negative += _negative_counters(item, f'{path}.{key}' if path else key)
+        return negative
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value < 0:
+        return [path]
+    return []
+
+def _without_zeros(value):
+    if isinstance(value, dict):
+        cleaned = {key: _without_zeros(item) for key, item in value.items()}
+        return {key: item for key, item in cleaned.items() if item != 0 and item != {}}
+    return value
+
+@project_stats_routes.route('/project_stats/<project_id>', methods=['GET'])
+def get_project_stats(project_id):
+    try:
+        stats_doc = db.collection(STATS_COLLECTION).document(project_id).get()
+        if not stats_doc.exists:
+            return jsonify({'error': 'No stats for this project'}), 404
+
+        stats = stats_doc.to_dict()
+        # Reported rather than hidden, so dashboards can flag the project and
+        # reconcile-project-stats can be run
+        negative = _negative_counters(stats)
+        if negative:
+            logger.warning('Negative stats counters for project %s: %s', project_id, ', '.join(negative))
+            stats['negativeCounters'] = negative
+        # Open items due on a day before today (UTC)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        stats['overdue'] = {
+            group: sum(count for day, count in (stats.get('dueBuckets', {}).get(group) or {}).items() if day < today)
+            for group in GROUPS.values()
+        }
+        for field in ('assignees', 'dueBuckets'):
+            stats[field] = _without_zeros(stats.get(field) or {})
+        for group in GROUPS.values():
+            for field in ('byStatus', 'byPriority'):
+                stats[group][field] = _without_zeros(stats[group].get(field) or {})
+
+        return jsonify(stats), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Recount every project's stats from its tasks and subtasks, repairing drift
+# from failed or out-of-band writes, and drop stats of deleted projects. Each
+# document is replaced, not merged, so zero counters are pruned.
+# Returns (rebuilt, removed).
+def reconcile_project_stats():
+    counts = defaultdict(Counter)
+    project_ids = {doc.id for doc in db.collection('Project').select([]).stream()}
+
+    task_projects = {}
+    for doc in db.collection('Tasks').select(['projectID'] + STATS_FIELDS).stream():
+        task = doc.to_dict()
+        task_projects[doc.id] = task.get('projectID')
+        counts[task.get('projectID')].update(_paths('task', task))
+
+    for doc in db.collection('Subtasks').select(['projectID', 'taskID'] + STATS_FIELDS).stream():
+        subtask = doc.to_dict()
+        # Older subtasks only know their task
+        project_id = subtask.get('projectID') or task_projects.get(subtask.get('taskID'))
+        counts[project_id].update(_paths('subtask', subtask))
+
+    removed = 0
+    with BatchWriter(db) as writer:
+        for project_id in project_ids:
+            stats = empty_stats(project_id)
+            for field, value in _nested(counts[project_id], int).items():
+                if isinstance(stats.get(field), dict):
+                    stats[field].update(value)
+                else:
+                    stats[field] = value
+            writer.set(db.collection(STATS_COLLECTION).document(project_id), stats)
+
+        for doc in db.collection(STATS_COLLECTION).select([]).stream():
+            if doc.id not in project_ids:
+                writer.delete(doc.reference)
+                removed += 1
+
+    return len(project_ids), removed
@@ -0,0 +1,49 @@
+import hashlib
+from datetime import datetime
+from flask import Response, request
+from storage import Increment
+from firebase_config import db
+
+# One tiny document per project whose counter is bumped by every write that
+# changes what the project's GET endpoints return
+VERSIONS_COLLECTION = 'ProjectVersions'
+
+# Queue a version bump on a write batch (db.batch() or BatchWriter) so it
+# commits atomically with the change itself
+def bump_project_version(batch, project_id):
+    if not project_id:
+        return
+    batch.set(db.collection(VERSIONS_COLLECTION).document(project_id), {
+        'version': Increment(1),
+        'updatedAt': datetime.utcnow().isoformat()
+    }, merge=True)
+
+# None when the project has no version document: it was deleted, or it
+# predates versioning and hasn't been written to since
+def get_project_version(project_id):
+    doc = db.collection(VERSIONS_COLLECTION).document(project_id).get()
+    return doc.to_dict().get('version', 0) if doc.exists else None
+
+# ETag for the current request: the project's version plus a digest of the
+# path and query string, so different views never share a tag. None (no
+# caching) for projects without a version document, so a deleted project
+# can never answer 304 and always gets its full (404) response.
+def project_etag(project_id):
+    version = get_project_version(project_id)
+    if version is None:
+        return None
+    view = hashlib.sha1(request.full_path.encode()).hexdigest()[:12]
+    return f'{project_id}.{version}.{view}'
+
+def etag_matches(etag):
+    return etag is not None and request.if_none_match.contains(etag)
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def with_etag(response, etag):
+    if etag:
+        response.set_etag(etag)
+    return response
@@ -0,0 +1,196 @@
+import json
+import os
+import queue
+import threading
+import time
+from flask import Blueprint, Response, jsonify, stream_with_context
+from firebase_config import db
+
+realtime_routes = Blueprint('realtime', __name__)
+
+# Collections watched for every active project (all carry projectID)
+WATCHED_COLLECTIONS = ['Tasks', 'Subtasks', 'Comments']
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv('REALTIME_QUEUE_SIZE', '256'))
+IDLE_LISTENER_SECONDS = float(os.getenv('REALTIME_IDLE_SECONDS', '60'))
+# Every open stream holds one of the worker's threads, so streams beyond this
+# are answered 503 to keep threads free for REST requests (gunicorn.conf.py
+# sets it to half the threads; 0 means no cap)
+MAX_SUBSCRIBERS = int(os.getenv('REALTIME_MAX_SUBSCRIBERS', '0'))
+
+# Listeners for one project, shared by all of its subscribers
+class ProjectChannel:
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self.subscribers = set()
+        self.watches = []
+        self.idle_since = None
+
+# Keeps at most one set of Firestore listeners per project with subscribers
+# and fans their changes out to each subscriber's bounded queue. Channels with
+# no subscribers are closed after IDLE_LISTENER_SECONDS.
+class RealtimeHub:
+    def __init__(self, idle_seconds=IDLE_LISTENER_SECONDS, queue_size=SUBSCRIBER_QUEUE_SIZE,
+                 max_subscribers=MAX_SUBSCRIBERS):
+        self.idle_seconds = idle_seconds
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._closed = False
+
+    def subscribe(self, project_id):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Realtime hub is shutting down')
+            if self.max_subscribers and self._subscriber_count() >= self.max_subscribers:
+                raise RuntimeError('Too many open streams on this server, retry shortly')
+            channel = self._channels.get(project_id)
+            if channel is None:
+                channel = ProjectChannel(project_id)
+                self._channels[project_id] = channel
+                self._start_watches(channel)
+            channel.subscribers.add(subscriber)
+            channel.idle_since = None
+            self._ensure_reaper()
+        return subscriber
+
+    def unsubscribe(self, project_id, subscriber):
+        with self._lock:
+            channel = self._channels.get(project_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers:
+                channel.idle_since = time.monotonic()
+
+    def _subscriber_count(self):
+        return sum(len(channel.subscribers) for channel in self._channels.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'subscribers': self._subscriber_count()
+            }
+
+    # End every open stream and stop all listeners, e.g. on worker shutdown
+    def close(self):
+        with self._lock:
+            self._closed = True
+            channels = list(self._channels.values())
+            self._channels.clear()
+
+        for channel in channels:
+            for subscriber in channel.subscribers:
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+            for watch in channel.watches:
+                watch.unsubscribe()
+
+    def _start_watches(self, channel):
+        for collection in WATCHED_COLLECTIONS:
+            query = db.collection(collection).where('projectID', '==', channel.project_id)
+            channel.watches.append(query.on_snapshot(self._make_callback(channel.project_id, collection)))
+
+    def _make_callback(self, project_id, collection):
+        # The first snapshot replays the current result set; subscribers
+        # already loaded it over REST, so only later changes are pushed
+        initial = {'pending': True}
+
+        def on_snapshot(doc_snapshots, changes, read_time):
+            if initial['pending']:
+                initial['pending'] = False
+                return
+            for change in changes:
+                removed = change.type.name == 'REMOVED'
+                self._publish(project_id, {
+                    'collection': collection,
+                    'type': change.type.name.lower(),
+                    'id': change.document.id,
+                    'data': None if removed else change.document.to_dict(),
+                    'readTime': read_time.isoformat() if read_time else None
+                })
+
+        return on_snapshot
+
+    def _publish(self, project_id, event):
+        with self._lock:
+            channel = self._channels.get(project_id)
+            subscribers = list(channel.subscribers) if channel else []
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A subscriber this far behind is dropped; it reconnects and
+                # catches up through /sync
+                self.unsubscribe(project_id, subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    def _ensure_reaper(self):
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap_idle_channels, name='realtime-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_idle_channels(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    channel for channel in self._channels.values()
+                    if channel.idle_since is not None and now - channel.idle_since >= self.idle_seconds
+                ]
+                for channel in idle:
+                    del self._channels[channel.project_id]
+
+            for channel in idle:
+                for watch in channel.watches:
+                    watch.unsubscribe()
+
+
+hub = RealtimeHub()
+
+# Server-Sent Events stream of task/subtask/comment changes for a project
+@realtime_routes.route('/subscribe/<project_id>', methods=['GET'])
+def subscribe(project_id):
+    try:
+        if not db.collection('Project').document(project_id).get().exists:
+            return jsonify({'error': 'Project not found'}), 404
+
+        try:
+            subscriber = hub.subscribe(project_id)
+        except RuntimeError as e:
+            # Clients back off and reconnect (catching up through /sync)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    try:
+                        event = subscriber.get(timeout=HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        # Heartbeats also surface disconnected clients
+                        yield ': keep-alive\n\n'
+                        continue
+                    if event is None:
+                        break
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            finally:
+                hub.unsubscribe(project_id, subscriber)
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,174 @@
+import os
+import re
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from firebase_config import db
+from batch_writer import BatchWriter
+
+search_routes = Blueprint('search', __name__)
+
+# One SearchIndex document per task, subtask and comment, written in the same
+# batch as the item itself. 'terms' holds every token and token prefix, so a
+# search is a single array_contains query (with projectID when given);
+# 'weights' lists each full token with its field weight for ranking. It is an
+# array of {token, weight} rather than a map because tokens such as __init__
+# are not valid Firestore field names. Firestore needs a composite index on
+# projectID + terms (array-contains); 'weights' is only read back and can be
+# exempted from indexing.
+SEARCH_COLLECTION = 'SearchIndex'
+
+MIN_PREFIX = 2
+MAX_PREFIX = 15
+MAX_TOKENS = 200
+SNIPPET_LENGTH = 120
+
+# Candidates read per search before ranking
+SEARCH_CANDIDATE_LIMIT = int(os.getenv('SEARCH_CANDIDATE_LIMIT', '500'))
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 100
+
+FIELD_WEIGHTS = {
+    'task': {'title': 3, 'description': 1},
+    'subtask': {'title': 3, 'description': 1},
+    'comment': {'message': 1}
+}
+
+_TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(str(text or '').casefold()) if len(token) >= MIN_PREFIX]
+
+def search_doc_id(kind, item_id):
+    return f'{kind}_{item_id}'
+
+def _weights(kind, data):
+    weights = {}
+    for field, weight in FIELD_WEIGHTS[kind].items():
+        for token in tokenize(data.get(field)):
+            weights[token] = max(weights.get(token, 0), weight)
+    if len(weights) > MAX_TOKENS:
+        weights = dict(sorted(weights.items(), key=lambda item: -item[1])[:MAX_TOKENS])
+    return weights
+
+def search_document(kind, item_id, data):
+    weights = _weights(kind, data)
+    terms = set()
+    for token in weights:
+        terms.update(token[:length] for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1))
+
+    snippet = data.get('title') if kind != 'comment' else data.get('message')
+    return {
+        'kind': kind,
+        'itemID': item_id,
+        'projectID': data.get('projectID'),
+        'taskID': data.get('taskID'),
+        'title': str(snippet or '')[:SNIPPET_LENGTH],
+        'terms': sorted(terms),
+        'weights': [{'token': token, 'weight': weight} for token, weight in weights.items()],
+        'updatedAt': data.get('updatedAt') or data.get('createdAt') or datetime.utcnow().isoformat()
+    }
+
+# Queue the index entry for an item on a batch/BatchWriter
+def index_item(batch, kind, item_id, data):
+    batch.set(db.collection(SEARCH_COLLECTION).document(search_doc_id(kind, item_id)),
+              search_document(kind, item_id, data))
+
+def unindex_item(batch, kind, item_id):
+    batch.delete(db.collection(SEARCH_COLLECTION).document(search_doc_id(kind, item_id)))
+
+# True when an update touches a field that feeds the index
+def affects_index(kind, update_data):
+    return any(field in update_data for field in FIELD_WEIGHTS[kind])
+
+def _weight_map(weights):
+    # Entries written before weights became an array hold a map
+    if isinstance(weights, dict):
+        return weights
+    return {entry['token']: entry['weight'] for entry in weights or []}
+
+# Every query token must prefix some indexed token; exact matches score full
+# weight and prefix matches half
+def _score(query_tokens, weights):
+    score = 0.0
+    for query_token in query_tokens:
+        best = 0.0
+        for token, weight in weights.items():
+            if token == query_token:
+                best = max(best, float(weight))
+            elif token.startswith(query_token):
+                best = max(best, weight / 2)
+        if not best:
+            return None
+        score += best
+    return score
+
+@search_routes.route('/search', methods=['GET'])
+def search():
+    try:
+        query_tokens = list(dict.fromkeys(tokenize(request.args.get('q'))))
+        if not query_tokens:
+            return jsonify({'error': f'q must contain a word of at least {MIN_PREFIX} characters'}), 400
+
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_RESULTS)), MAX_RESULTS)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+
+        kinds = request.args.get('kind')
+        kinds = set(kinds.split(',')) if kinds else None
+
+        # The longest token is the most selective; the rest are checked
+        # against each candidate's weights
+        probe = max(query_tokens, key=len)[:MAX_PREFIX]
+        query = db.collection(SEARCH_COLLECTION).where('terms', 'array_contains', probe)
+        project_id = request.args.get('projectID')
+        if project_id:
+            query = query.where('projectID', '==', project_id)
+        query = query.select(['kind', 'itemID', 'projectID', 'taskID', 'title', 'weights', 'updatedAt'])
+
+        results = []
+        for doc in query.limit(SEARCH_CANDIDATE_LIMIT).stream():
+            entry = doc.to_dict()
+            if kinds and entry.get('kind') not in kinds:
+                continue
+            score = _score(query_tokens, _weight_map(entry.get('weights')))
+            if score is None:
+                continue
+            entry.pop('weights', None)
+            entry['score'] = score
+            results.append(entry)
+
+        results.sort(key=lambda entry: entry.get('updatedAt') or '', reverse=True)
+        results.sort(key=lambda entry: entry['score'], reverse=True)
+
+        return jsonify({'results': results[:limit], 'total': len(results)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Rebuild the whole index from Tasks, Subtasks and Comments and drop entries
+# for items that no longer exist. Returns (indexed, removed).
+def rebuild_search_index():
+    live = set()
+    task_projects = {}
+    with BatchWriter(db) as writer:
+        for collection, kind in (('Tasks', 'task'), ('Subtasks', 'subtask'), ('Comments', 'comment')):
+            for doc in db.collection(collection).stream():
+                data = doc.to_dict()
+                if kind == 'task':
+                    task_projects[doc.id] = data.get('projectID')
+                elif not data.get('projectID'):
+                    # Older subtasks and comments only know their task
+                    data['projectID'] = task_projects.get(data.get('taskID'))
+                index_item(writer, kind, doc.id, data)
+                live.add(search_doc_id(kind, doc.id))
+
+        removed = 0
+        for doc in db.collection(SEARCH_COLLECTION).select([]).stream():
+            if doc.id not in live:
+                writer.delete(doc.reference)
+                removed += 1
+
+    return len(live), removed
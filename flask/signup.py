@@ -1,12 +1,12 @@
 import os
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
+from firebase_config import auth, db
+from user_cache import user_cache
+from username_index import normalize_username, username_index
 from datetime import datetime
 import random
 import string
 
-db, auth = initialize_firebase()
-
 signup_routes = Blueprint('signup', __name__)
 
 # Helper function to generate random avatar URL using RoboHash
@@ -36,6 +36,7 @@ def signup():
         user_data = {
             'userID': user.uid,
             'name': name,
+            'nameKey': normalize_username(name),
             'email': email,
             'role': role,
             'avatar': avatar_url,  # Store avatar URL
@@ -43,6 +44,8 @@ def signup():
             'createdAt': datetime.utcnow().isoformat()
         }
         db.collection('User').document(user.uid).set(user_data)
+        user_cache.put(user.uid, user_data)
+        username_index.add(user.uid, name)
 
         return jsonify({"message": "User created successfully", "userId": user.uid, "avatar": avatar_url}), 201
 
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+# Modules that should only load once the storage client is first used
+HEAVY_MODULES = ['firebase_admin', 'google.cloud.firestore', 'grpc', 'requests']
+
+# Runs in a fresh interpreter so the timings are those of a cold start
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+error = None
+try:
+    from firebase_config import initialize_firebase
+    initialize_firebase()
+except Exception as e:
+    error = str(e)
+ready = time.perf_counter()
+print(json.dumps({
+    'appImportMs': round((imported - started) * 1000, 1),
+    'clientInitMs': round((ready - imported) * 1000, 1),
+    'heavyModulesAtImport': loaded,
+    'clientInitError': error
+}))
+'''
+
+def _parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'selfMs': round(int(self_us) / 1000, 2),
+            'cumulativeMs': round(int(cumulative_us) / 1000, 2)
+        })
+    return modules
+
+# Cold-start report: time to import the app, time to create the storage
+# client, which heavy modules the import pulled in, and the slowest imports
+def startup_report(top=15):
+    script = f'HEAVY_MODULES = {HEAVY_MODULES!r}\n' + _PROBE
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'probe failed')
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = _parse_importtime(result.stderr)
+    report['modulesImported'] = len(modules)
+    report['slowestTopLevel'] = sorted((module for module in modules if module['depth'] == 0),
+                                       key=lambda module: module['cumulativeMs'], reverse=True)[:top]
+    report['slowestSelf'] = sorted(modules, key=lambda module: module['selfMs'], reverse=True)[:top]
+    return report
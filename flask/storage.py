@@ -0,0 +1,68 @@
+from firebase_config import STORAGE_BACKEND, db
+
+# Firestore caps the number of values in an 'in' filter
+IN_QUERY_LIMIT = 30
+
+# Keep each batched read well under Firestore's request size limits
+GET_ALL_BATCH_SIZE = 100
+
+# Write transforms for the active storage backend. Handlers import these
+# instead of google.cloud.firestore so the same code runs on either engine.
+# The backend module is only imported when a transform is first built, which
+# keeps google.cloud.firestore (and gRPC) out of the app's import path.
+_transforms = None
+
+def _backend():
+    global _transforms
+    if _transforms is None:
+        if STORAGE_BACKEND == 'sqlite':
+            import local_store as module
+        else:
+            from google.cloud import firestore as module
+        _transforms = module
+    return _transforms
+
+def Increment(value):
+    return _backend().Increment(value)
+
+def ArrayUnion(values):
+    return _backend().ArrayUnion(values)
+
+def ArrayRemove(values):
+    return _backend().ArrayRemove(values)
+
+# Raised by DocumentReference.create() when the document already exists
+def already_exists_error():
+    if STORAGE_BACKEND == 'sqlite':
+        return _backend().AlreadyExists
+    from google.api_core.exceptions import AlreadyExists
+    return AlreadyExists
+
+# Raised on commit when a write's precondition (see unchanged_since) fails
+def precondition_failed_error():
+    if STORAGE_BACKEND == 'sqlite':
+        return _backend().FailedPrecondition
+    from google.api_core.exceptions import FailedPrecondition
+    return FailedPrecondition
+
+# Write option for update()/delete() that only lets the write through while
+# the document is as it was in snapshot
+def unchanged_since(snapshot):
+    return db.write_option(last_update_time=snapshot.update_time)
+
+# Read many documents (any collections) with chunked get_all calls, each
+# document once. Returns the snapshots keyed by path, e.g. 'Tasks/<taskID>'.
+def get_documents(refs):
+    unique_refs = list({ref.path: ref for ref in refs}.values())
+    snapshots = {}
+    for start in range(0, len(unique_refs), GET_ALL_BATCH_SIZE):
+        for doc in db.get_all(unique_refs[start:start + GET_ALL_BATCH_SIZE]):
+            snapshots[doc.reference.path] = doc
+    return snapshots
+
+def __getattr__(name):
+    if name == 'DELETE_FIELD':
+        return _backend().DELETE_FIELD
+    raise AttributeError(name)
+
+__all__ = ['DELETE_FIELD', 'ArrayRemove', 'ArrayUnion', 'Increment']
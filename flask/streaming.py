@@ -0,0 +1,56 @@
+from flask import Response, current_app, request, stream_with_context
+
+# Hydrate and serialize streamed items in groups of this size so batched
+# user lookups still apply while memory stays bounded
+STREAM_CHUNK_SIZE = 100
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# ?stream=1 (or json) streams a JSON document; ?stream=ndjson or an
+# "Accept: application/x-ndjson" header streams one item per line
+def stream_requested():
+    return request.args.get('stream') in ('1', 'true', 'json', 'ndjson') or wants_ndjson()
+
+def wants_ndjson():
+    return request.args.get('stream') == 'ndjson' or NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Stream `items` (any iterable of dicts, typically built lazily from
+# query.stream()) as {"<key>": [...], "nextCursor": ...} or as NDJSON.
+# `hydrate` is applied to each chunk in place before it is written out.
+def stream_items(key, items, hydrate=None, next_cursor=None):
+    dumps = current_app.json.dumps
+    ndjson = wants_ndjson()
+
+    def generate():
+        if not ndjson:
+            yield '{' + dumps(key) + ':['
+
+        first = True
+        for chunk in _chunks(items, STREAM_CHUNK_SIZE):
+            if hydrate:
+                hydrate(chunk)
+            for item in chunk:
+                if ndjson:
+                    yield dumps(item) + '\n'
+                else:
+                    yield ('' if first else ',') + dumps(item)
+                first = False
+
+        if not ndjson:
+            yield '],"nextCursor":' + dumps(next_cursor) + '}'
+
+    response = Response(stream_with_context(generate()),
+                        mimetype=NDJSON_MIMETYPE if ndjson else 'application/json')
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
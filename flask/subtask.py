@@ -1,28 +1,65 @@
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
+from firebase_config import db
+from user_hydration import attach_assignees
+from username_index import AssigneeError, resolve_assignee, username_index
+from fanout import run_parallel
+from pagination import DOCUMENT_ID, fetch_page
+from sync import record_tombstone
+from project_versions import bump_project_version, etag_matches, not_modified, project_etag, with_etag
+from search import affects_index, index_item, unindex_item
+from dates import normalize_due_date
+from notifications import affects_reminders, cancel_reminders, schedule_reminders
+from project_stats import COMMIT_ATTEMPTS, apply_stats, stats_changes
+from storage import precondition_failed_error, unchanged_since
 import uuid
 from datetime import datetime
 
-db, _ = initialize_firebase()
 subtask_routes = Blueprint('subtask', __name__)
 
+SUBTASK_UPDATE_FIELDS = ['title', 'description', 'status', 'priority', 'dueDate']
+
+# Build a new Subtask document from request data (callers validate it first).
+# Raises ValueError for an unparseable dueDate.
+def new_subtask_document(data, project_id, assigned_to):
+    now = datetime.utcnow().isoformat()
+    return {
+        'subtaskID': str(uuid.uuid4()),
+        'taskID': data.get('taskID'),
+        'projectID': project_id,
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'status': data.get('status', 'Not Started'),
+        'priority': data.get('priority', 'Medium'),
+        'assignedTo': assigned_to,
+        'dueDate': normalize_due_date(data.get('dueDate')),
+        'createdAt': now,
+        'updatedAt': now
+    }
+
+# Subtasks created before projectID was stored on them fall back to their task
+def project_id_for_subtask(subtask_data):
+    if subtask_data.get('projectID'):
+        return subtask_data['projectID']
+    task_doc = db.collection('Tasks').document(subtask_data.get('taskID')).get()
+    return task_doc.to_dict().get('projectID') if task_doc.exists else None
+
 @subtask_routes.route('/create_subtask', methods=['POST'])
 def create_subtask():
     try:
         data = request.get_json()
         title = data.get('title')
-        description = data.get('description')
-        status = data.get('status', 'Not Started')
-        priority = data.get('priority', 'Medium')
         task_id = data.get('taskID')
-        due_date = data.get('dueDate')
         assigned_username = data.get('assignedUsername')  # <-- user input username
 
         if not title or not task_id:
             return jsonify({'error': 'Subtask title and taskID are required'}), 400
 
-        # Check if task exists
-        task_doc = db.collection('Tasks').document(task_id).get()
+        # Check the task and resolve the optional assignee concurrently
+        task_doc, user_ids = run_parallel(
+            lambda: db.collection('Tasks').document(task_id).get(),
+            lambda: username_index.lookup(assigned_username) if assigned_username else []
+        )
+
         if not task_doc.exists:
             return jsonify({'error': 'Task does not exist'}), 404
 
@@ -30,29 +67,26 @@ def create_subtask():
 
         # If assignedUsername provided, lookup userID
         if assigned_username:
-            user_query = db.collection('User').where('name', '==', assigned_username).limit(1).stream()
-            user_doc = next(user_query, None)
-
-            if user_doc:
-                assigned_to_user_id = user_doc.id
-            else:
-                return jsonify({'error': 'Assigned username not found'}), 404
+            try:
+                assigned_to_user_id = resolve_assignee(assigned_username, user_ids)
+            except AssigneeError as e:
+                return jsonify(e.to_dict()), e.status
 
         # Create subtask
-        subtask_id = str(uuid.uuid4())
-        subtask_data = {
-            'subtaskID': subtask_id,
-            'taskID': task_id,
-            'title': title,
-            'description': description,
-            'status': status,
-            'priority': priority,
-            'assignedTo': assigned_to_user_id,
-            'dueDate': due_date,
-            'createdAt': datetime.utcnow().isoformat()
-        }
-
-        db.collection('Subtasks').document(subtask_id).set(subtask_data)
+        project_id = task_doc.to_dict().get('projectID')
+        try:
+            subtask_data = new_subtask_document(data, project_id, assigned_to_user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        subtask_id = subtask_data['subtaskID']
+
+        batch = db.batch()
+        batch.set(db.collection('Subtasks').document(subtask_id), subtask_data)
+        index_item(batch, 'subtask', subtask_id, subtask_data)
+        apply_stats(batch, project_id, stats_changes('subtask', new=subtask_data))
+        schedule_reminders(batch, 'subtask', subtask_id, subtask_data)
+        bump_project_version(batch, project_id)
+        batch.commit()
 
         return jsonify({'message': 'Subtask created successfully', 'subtaskID': subtask_id}), 201
 
@@ -65,24 +99,25 @@ def get_subtasks(task_id):
         if not task_id:
             return jsonify({'error': 'taskID is required'}), 400
 
+        # Subtasks are versioned with their parent task's project
+        etag = None
+        task_doc = db.collection('Tasks').document(task_id).get()
+        if task_doc.exists and task_doc.to_dict().get('projectID'):
+            etag = project_etag(task_doc.to_dict()['projectID'])
+            if etag_matches(etag):
+                return not_modified(etag)
+
         subtasks_ref = db.collection('Subtasks').where('taskID', '==', task_id)
-        subtasks = []
-        for doc in subtasks_ref.stream():
-            subtask = doc.to_dict()
 
-            assigned_to_user_id = subtask.get('assignedTo')
-            if assigned_to_user_id:
-                user_doc = db.collection('User').document(assigned_to_user_id).get()
-                if user_doc.exists:
-                    subtask['assignedUsername'] = user_doc.to_dict().get('name', '')
-                else:
-                    subtask['assignedUsername'] = 'Unknown User'
-            else:
-                subtask['assignedUsername'] = 'Unassigned'
+        try:
+            docs, next_cursor = fetch_page(subtasks_ref, [DOCUMENT_ID], required_fields=['subtaskID', 'assignedTo'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-            subtasks.append(subtask)
+        subtasks = [doc.to_dict() for doc in docs]
+        attach_assignees(subtasks)
 
-        return jsonify({'subtasks': subtasks}), 200
+        return with_etag(jsonify({'subtasks': subtasks, 'nextCursor': next_cursor}), etag), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -92,43 +127,62 @@ def update_subtask(subtask_id):
     try:
         data = request.get_json()
         subtask_ref = db.collection('Subtasks').document(subtask_id)
+        subtask_doc = subtask_ref.get()
 
-        if not subtask_ref.get().exists:
+        if not subtask_doc.exists:
             return jsonify({'error': 'Subtask not found'}), 404
 
         update_data = {}
 
-        for field in ['title', 'description', 'status', 'priority', 'dueDate']:
+        for field in SUBTASK_UPDATE_FIELDS:
             if field in data:
                 update_data[field] = data[field]
 
+        if 'dueDate' in update_data:
+            try:
+                update_data['dueDate'] = normalize_due_date(update_data['dueDate'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
         # Handle assignedUsername
         if 'assignedUsername' in data:
-            username = data['assignedUsername']
-            user_query = db.collection('User').where('name', '==', username).limit(1).stream()
-            user_doc = next(user_query, None)
-
-            if user_doc:
-                update_data['assignedTo'] = user_doc.id
-            else:
-                return jsonify({'error': 'Assigned username not found'}), 404
+            try:
+                update_data['assignedTo'] = resolve_assignee(data['assignedUsername'])
+            except AssigneeError as e:
+                return jsonify(e.to_dict()), e.status
 
         update_data['updatedAt'] = datetime.utcnow().isoformat()
 
-        subtask_ref.update(update_data)
-
-        # Return updated subtask
-        updated_subtask = subtask_ref.get().to_dict()
-
-        assigned_to_user_id = updated_subtask.get('assignedTo')
-        if assigned_to_user_id:
-            user_doc = db.collection('User').document(assigned_to_user_id).get()
-            if user_doc.exists:
-                updated_subtask['assignedUsername'] = user_doc.to_dict().get('name', '')
-            else:
-                updated_subtask['assignedUsername'] = 'Unknown User'
+        # Committed only while the subtask is unchanged since it was read, so
+        # the stats diff is never taken twice against the same snapshot
+        conflict = precondition_failed_error()
+        for attempt in range(COMMIT_ATTEMPTS):
+            if attempt:
+                subtask_doc = subtask_ref.get()
+                if not subtask_doc.exists:
+                    return jsonify({'error': 'Subtask not found'}), 404
+
+            # Return updated subtask, merged into the snapshot we already hold
+            updated_subtask = {**subtask_doc.to_dict(), **update_data}
+
+            batch = db.batch()
+            batch.update(subtask_ref, update_data, option=unchanged_since(subtask_doc))
+            if affects_index('subtask', update_data):
+                index_item(batch, 'subtask', subtask_id, updated_subtask)
+            project_id = project_id_for_subtask(subtask_doc.to_dict())
+            apply_stats(batch, project_id, stats_changes('subtask', subtask_doc.to_dict(), updated_subtask))
+            if affects_reminders('subtask', update_data):
+                schedule_reminders(batch, 'subtask', subtask_id, updated_subtask)
+            bump_project_version(batch, project_id)
+            try:
+                batch.commit()
+                break
+            except conflict:
+                continue
         else:
-            updated_subtask['assignedUsername'] = 'Unassigned'
+            return jsonify({'error': 'Subtask is being updated concurrently, please retry'}), 409
+
+        attach_assignees([updated_subtask])
 
         return jsonify({'message': 'Subtask updated successfully', 'subtask': updated_subtask}), 200
 
@@ -139,11 +193,25 @@ def update_subtask(subtask_id):
 def delete_subtask(subtask_id):
     try:
         subtask_ref = db.collection('Subtasks').document(subtask_id)
+        subtask_doc = subtask_ref.get()
 
-        if not subtask_ref.get().exists:
+        if not subtask_doc.exists:
             return jsonify({'error': 'Subtask not found'}), 404
 
-        subtask_ref.delete()
+        batch = db.batch()
+        project_id = project_id_for_subtask(subtask_doc.to_dict())
+        # Only while the subtask is as read, since its stats are subtracted
+        # from that snapshot (a concurrent update or delete gets a 409)
+        batch.delete(subtask_ref, option=unchanged_since(subtask_doc))
+        unindex_item(batch, 'subtask', subtask_id)
+        record_tombstone(batch, 'subtask', subtask_id, project_id)
+        apply_stats(batch, project_id, stats_changes('subtask', old=subtask_doc.to_dict()))
+        cancel_reminders(batch, 'subtask', subtask_id)
+        bump_project_version(batch, project_id)
+        try:
+            batch.commit()
+        except precondition_failed_error():
+            return jsonify({'error': 'Subtask changed while being deleted, please retry'}), 409
 
         return jsonify({'message': 'Subtask deleted successfully'}), 200
 
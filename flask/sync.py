@@ -0,0 +1,92 @@
+import os
+from flask import Blueprint, request, jsonify
+from firebase_config import db
+from user_hydration import attach_assignees, attach_authors, fetch_users
+from fanout import run_parallel
+from datetime import datetime, timedelta, timezone
+
+sync_routes = Blueprint('sync', __name__)
+
+TOMBSTONES_COLLECTION = 'Tombstones'
+
+# updatedAt/createdAt are stamped by the handler before its commit, on
+# whichever worker served it, so a write can land after a sync that should
+# have seen it. Each sync therefore also returns changes from this long
+# before `since`; clients apply them by ID, so repeats are harmless.
+SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', '60'))
+
+# Queue a deletion marker on the same batch as the delete itself
+def record_tombstone(batch, kind, item_id, project_id):
+    if not project_id:
+        return
+    batch.set(db.collection(TOMBSTONES_COLLECTION).document(f'{kind}_{item_id}'), {
+        'kind': kind,
+        'id': item_id,
+        'projectID': project_id,
+        'deletedAt': datetime.utcnow().isoformat()
+    })
+
+# Timestamps are stored as naive UTC isoformat strings, so `since` is brought
+# into the same form to compare correctly
+def _normalize_since(since):
+    parsed = datetime.fromisoformat(since.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+def _changed(collection, project_id, field, since):
+    query = db.collection(collection).where('projectID', '==', project_id).where(field, '>', since)
+    return [doc.to_dict() for doc in query.stream()]
+
+# Tasks, subtasks and comments created or updated after `since` (less the
+# overlap), plus deletions. Clients pass the returned serverTime as the next
+# `since` and upsert/remove items by ID.
+@sync_routes.route('/sync', methods=['GET'])
+def sync():
+    try:
+        project_id = request.args.get('projectID')
+        since = request.args.get('since')
+
+        if not project_id or not since:
+            return jsonify({'error': 'projectID and since are required'}), 400
+
+        try:
+            since = _normalize_since(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+
+        # Taken before querying so nothing written meanwhile is skipped next time
+        server_time = datetime.utcnow().isoformat()
+        changed_after = (datetime.fromisoformat(since) - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+
+        tasks, subtasks, comments, tombstones = run_parallel(
+            lambda: _changed('Tasks', project_id, 'updatedAt', changed_after),
+            lambda: _changed('Subtasks', project_id, 'updatedAt', changed_after),
+            lambda: _changed('Comments', project_id, 'createdAt', changed_after),
+            lambda: _changed(TOMBSTONES_COLLECTION, project_id, 'deletedAt', changed_after)
+        )
+
+        users = fetch_users(
+            [item.get('assignedTo') for item in tasks + subtasks]
+            + [comment.get('userID') for comment in comments]
+        )
+        attach_assignees(tasks, users)
+        attach_assignees(subtasks, users)
+        attach_authors(comments, users)
+
+        return jsonify({
+            'projectID': project_id,
+            'since': since,
+            'changedAfter': changed_after,
+            'serverTime': server_time,
+            'tasks': tasks,
+            'subtasks': subtasks,
+            'comments': comments,
+            'deleted': [
+                {'kind': tombstone['kind'], 'id': tombstone['id'], 'deletedAt': tombstone['deletedAt']}
+                for tombstone in tombstones
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,52 +1,81 @@
 from flask import Blueprint, request, jsonify
-from firebase_config import initialize_firebase
+from firebase_config import db
+from user_hydration import attach_assignees, get_user
+from username_index import AssigneeError, resolve_assignee
+from fanout import run_parallel
+from pagination import DOCUMENT_ID, fetch_page
+from streaming import stream_items, stream_requested
+from cascade import delete_task_cascade
+from project_versions import bump_project_version, etag_matches, not_modified, project_etag, with_etag
+from search import affects_index, index_item
+from dates import normalize_due_date
+from notifications import affects_reminders, schedule_reminders
+from project_stats import COMMIT_ATTEMPTS, apply_stats, stats_changes
+from storage import precondition_failed_error, unchanged_since
 import uuid
 from datetime import datetime
 
-db, _ = initialize_firebase()
 task_routes = Blueprint('task', __name__)
 
+TASK_UPDATE_FIELDS = ['title', 'description', 'status', 'priority', 'dueDate']
+
+# Build a new Task document from request data (callers validate it first).
+# Raises ValueError for an unparseable dueDate.
+def new_task_document(data):
+    now = datetime.utcnow().isoformat()
+    return {
+        'taskID': str(uuid.uuid4()),
+        'projectID': data.get('projectID'),
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'status': data.get('status', 'To Do'),
+        'priority': data.get('priority', 'Medium'),
+        'assignedTo': data.get('assignedTo'),
+        'dueDate': normalize_due_date(data.get('dueDate')),
+        'commentCount': 0,
+        'createdAt': now,
+        'updatedAt': now
+    }
+
 @task_routes.route('/create_task', methods=['POST'])
 def create_task():
     try:
         data = request.get_json()
         title = data.get('title')
-        description = data.get('description')
-        status = data.get('status', 'To Do')
-        priority = data.get('priority', 'Medium')
         assigned_to = data.get('assignedTo')
-        due_date = data.get('dueDate')
         project_id = data.get('projectID')
 
         if not title or not project_id:
             return jsonify({'error': 'Task title and projectID are required'}), 400
 
-        # ✅ Check if project exists
-        project_doc = db.collection('Project').document(project_id).get()
+        # ✅ Check the project and the optional assignee concurrently
+        project_doc, assigned_user = run_parallel(
+            lambda: db.collection('Project').document(project_id).get(),
+            lambda: get_user(assigned_to)
+        )
+
         if not project_doc.exists:
             return jsonify({'error': 'Project does not exist'}), 404
 
         # ✅ Optional: Check if assignedTo is a valid user
         if assigned_to:
-            user_doc = db.collection('User').document(assigned_to).get()
-            if not user_doc.exists:
+            if not assigned_user:
                 return jsonify({'error': f'Assigned user ({assigned_to}) not found'}), 404
 
         # ✅ Create and save task
-        task_id = str(uuid.uuid4())
-        task_data = {
-            'taskID': task_id,
-            'projectID': project_id,
-            'title': title,
-            'description': description,
-            'status': status,
-            'priority': priority,
-            'assignedTo': assigned_to,
-            'dueDate': due_date,
-            'createdAt': datetime.utcnow().isoformat()
-        }
-
-        db.collection('Tasks').document(task_id).set(task_data)
+        try:
+            task_data = new_task_document(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        task_id = task_data['taskID']
+
+        batch = db.batch()
+        batch.set(db.collection('Tasks').document(task_id), task_data)
+        index_item(batch, 'task', task_id, task_data)
+        apply_stats(batch, project_id, stats_changes('task', new=task_data))
+        schedule_reminders(batch, 'task', task_id, task_data)
+        bump_project_version(batch, project_id)
+        batch.commit()
 
         return jsonify({'message': 'Task created successfully', 'taskID': task_id}), 201
 
@@ -62,34 +91,36 @@ def get_tasks():
         tasks_ref = db.collection('Tasks')
         query = tasks_ref
 
+        # Project-scoped listings can be answered from the version clock alone
+        etag = None
+        if project_id:
+            etag = project_etag(project_id)
+            if etag_matches(etag):
+                return not_modified(etag)
+
         # Apply filters based on query parameters
         if project_id:
             query = query.where('projectID', '==', project_id)
         if assigned_to:
             query = query.where('assignedTo', '==', assigned_to)
 
-        tasks = []
-        for doc in query.stream():
-            task = doc.to_dict()
-
-            # Attach user info if assigned
-            assigned_user_id = task.get('assignedTo')
-            if assigned_user_id:
-                user_doc = db.collection('User').document(assigned_user_id).get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
-                    task['assignedUsername'] = user_data.get('name', '')
-                    task['assignedAvatar'] = user_data.get('avatar', '')
-                else:
-                    task['assignedUsername'] = 'Unknown User'
-                    task['assignedAvatar'] = ''
-            else:
-                task['assignedUsername'] = 'Unassigned'
-                task['assignedAvatar'] = ''
-
-            tasks.append(task)
-
-        return jsonify({'tasks': tasks}), 200
+        streaming = stream_requested()
+        try:
+            docs, next_cursor = fetch_page(query, [DOCUMENT_ID], required_fields=['taskID', 'assignedTo'],
+                                           lazy=streaming)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if streaming:
+            return with_etag(stream_items('tasks', (doc.to_dict() for doc in docs),
+                                          hydrate=attach_assignees, next_cursor=next_cursor), etag)
+
+        tasks = [doc.to_dict() for doc in docs]
+
+        # Attach user info with one batched lookup for all assignees
+        attach_assignees(tasks)
+
+        return with_etag(jsonify({'tasks': tasks, 'nextCursor': next_cursor}), etag), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -99,43 +130,63 @@ def update_task(task_id):
     try:
         data = request.get_json()
         task_ref = db.collection('Tasks').document(task_id)
+        task_doc = task_ref.get()
 
-        if not task_ref.get().exists:
+        if not task_doc.exists:
             return jsonify({'error': 'Task not found'}), 404
 
         update_data = {}
 
-        for field in ['title', 'description', 'status', 'priority', 'dueDate']:
+        for field in TASK_UPDATE_FIELDS:
             if field in data:
                 update_data[field] = data[field]
 
-        # Special handling for assignedUsername (not assignedTo)
-        if 'assignedUsername' in data:
-            username = data['assignedUsername']
-            # Search User collection by 'name'
-            user_query = db.collection('User').where('name', '==', username).limit(1).stream()
-            user_doc = next(user_query, None)
+        if 'dueDate' in update_data:
+            try:
+                update_data['dueDate'] = normalize_due_date(update_data['dueDate'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
-            if user_doc:
-                update_data['assignedTo'] = user_doc.id  # Get the userId
-            else:
-                return jsonify({'error': 'Assigned user not found'}), 404
+        # Special handling for assignedUsername (not assignedTo), resolved
+        # through the in-process username index
+        if 'assignedUsername' in data:
+            try:
+                update_data['assignedTo'] = resolve_assignee(data['assignedUsername'])
+            except AssigneeError as e:
+                return jsonify(e.to_dict()), e.status
 
         update_data['updatedAt'] = datetime.utcnow().isoformat()
-        task_ref.update(update_data)
-
-        # After update, retrieve latest task to include assignedUsername
-        updated_task = task_ref.get().to_dict()
-
-        assigned_user_id = updated_task.get('assignedTo')
-        if assigned_user_id:
-            user_doc = db.collection('User').document(assigned_user_id).get()
-            if user_doc.exists:
-                updated_task['assignedUsername'] = user_doc.to_dict().get('name', '')
-            else:
-                updated_task['assignedUsername'] = 'Unknown User'
+
+        # The stats diff is taken against the snapshot, so the update only
+        # commits while the task is unchanged since it was read; after a
+        # concurrent write it is re-read and the diff taken again
+        conflict = precondition_failed_error()
+        for attempt in range(COMMIT_ATTEMPTS):
+            if attempt:
+                task_doc = task_ref.get()
+                if not task_doc.exists:
+                    return jsonify({'error': 'Task not found'}), 404
+
+            # Apply the update to the snapshot we already hold instead of re-reading
+            updated_task = {**task_doc.to_dict(), **update_data}
+
+            batch = db.batch()
+            batch.update(task_ref, update_data, option=unchanged_since(task_doc))
+            if affects_index('task', update_data):
+                index_item(batch, 'task', task_id, updated_task)
+            apply_stats(batch, updated_task.get('projectID'), stats_changes('task', task_doc.to_dict(), updated_task))
+            if affects_reminders('task', update_data):
+                schedule_reminders(batch, 'task', task_id, updated_task)
+            bump_project_version(batch, task_doc.to_dict().get('projectID'))
+            try:
+                batch.commit()
+                break
+            except conflict:
+                continue
         else:
-            updated_task['assignedUsername'] = 'Unassigned'
+            return jsonify({'error': 'Task is being updated concurrently, please retry'}), 409
+
+        attach_assignees([updated_task])
 
         return jsonify({'message': 'Task updated successfully', 'task': updated_task}), 200
 
@@ -146,11 +197,32 @@ def update_task(task_id):
 def delete_task(task_id):
     try:
         task_ref = db.collection('Tasks').document(task_id)
-        if not task_ref.get().exists:
+        task_doc = task_ref.get()
+        if not task_doc.exists:
             return jsonify({'error': 'Task not found'}), 404
 
-        task_ref.delete()
-        return jsonify({'message': 'Task deleted successfully'}), 200
+        # Subtasks and comments are deleted along with the task, each only
+        # while unchanged since it was read; after a concurrent write the
+        # task is re-read and the rest of the cascade run again
+        background = request.args.get('background') in ('1', 'true')
+        for attempt in range(COMMIT_ATTEMPTS):
+            if attempt:
+                task_doc = task_ref.get()
+                if not task_doc.exists:
+                    return jsonify({'error': 'Task not found'}), 404
+            job = delete_task_cascade(task_doc, background=background)
+            if not job.conflict:
+                break
+        else:
+            return jsonify({'error': 'Task is being updated concurrently, please retry',
+                            'job': job.to_dict()}), 409
+
+        if background:
+            return jsonify({'message': 'Task deletion started', 'job': job.to_dict()}), 202
+        if job.status == 'failed':
+            return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+
+        return jsonify({'message': 'Task deleted successfully', 'job': job.to_dict()}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import sys
+
+# The handlers run against a fresh in-memory local engine per test
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = ':memory:'
+os.environ.setdefault('REQUEST_LOGS', '0')
+os.environ.pop('METRICS_DIR', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import firebase_config
+from app import create_app
+from firebase_config import db
+from user_cache import user_cache
+from username_index import normalize_username, username_index
+
+
+@pytest.fixture
+def client():
+    firebase_config._clients = None
+    user_cache.clear()
+    username_index._ids_by_name = {}
+    username_index._built_at = None
+    return create_app().test_client()
+
+
+@pytest.fixture
+def make_user(client):
+    def make(user_id, name=None):
+        name = name or user_id
+        db.collection('User').document(user_id).set({
+            'userID': user_id, 'name': name, 'nameKey': normalize_username(name),
+            'email': f'{user_id}@example.com', 'projects': []
+        })
+        return user_id
+    return make
+
+
+@pytest.fixture
+def project(client, make_user):
+    owner = make_user('owner')
+    response = client.post('/create_project', json={'title': 'Project', 'ownerID': owner})
+    assert response.status_code == 201
+    return response.get_json()['projectID']
+
+
+@pytest.fixture
+def make_task(client, project):
+    def make(**fields):
+        response = client.post('/create_task', json={'title': 'Task', 'projectID': project, **fields})
+        assert response.status_code == 201
+        return response.get_json()['taskID']
+    return make
+
+
+@pytest.fixture
+def make_subtask(client):
+    def make(task_id, **fields):
+        response = client.post('/create_subtask', json={'title': 'Subtask', 'taskID': task_id, **fields})
+        assert response.status_code == 201
+        return response.get_json()['subtaskID']
+    return make
@@ -0,0 +1,103 @@
+import local_store
+from firebase_config import db
+
+
+def results(response, section):
+    return [result.get('error', result['status']) for result in response.get_json()['results'][section]]
+
+
+def test_per_item_errors(client, project, make_user, make_task):
+    make_user('alice', 'Alice')
+    make_user('bob1', 'Bob')
+    make_user('bob2', 'bob')
+    task_id = make_task()
+
+    response = client.post('/bulk/tasks', json={
+        'create': [
+            'not an object',
+            {'title': 'ok', 'projectID': project, 'assignedUsername': 'ALICE'},
+            {'title': 'no project'},
+            {'title': 'missing project', 'projectID': 'nope'},
+            {'title': 'ambiguous', 'projectID': project, 'assignedUsername': 'bob'},
+            {'title': 'unknown user', 'projectID': project, 'assignedTo': 'ghost'},
+            {'title': 'bad date', 'projectID': project, 'dueDate': 'someday'}
+        ],
+        'update': [
+            None,
+            {'taskID': 'nope', 'status': 'Done'},
+            {'taskID': ['not', 'an', 'id']},
+            {'taskID': task_id, 'status': 'Done'}
+        ]
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['created'], body['updated'], body['failed']) == (1, 1, 9)
+    assert results(response, 'create') == [
+        'Each item must be an object',
+        'created',
+        'Task title and projectID are required',
+        'Project does not exist',
+        'Username (bob) matches more than one user',
+        'Assigned user (ghost) not found',
+        "Invalid date: 'someday'"
+    ]
+    assert results(response, 'update') == ['Each item must be an object', 'Task not found', 'Task not found', 'updated']
+    created_id = body['results']['create'][1]['taskID']
+    assert db.collection('Tasks').document(created_id).get().to_dict()['assignedTo'] == 'alice'
+
+
+def test_payload_errors(client):
+    assert client.post('/bulk/tasks', json={'create': {}}).status_code == 400
+    assert client.post('/bulk/subtasks', json={'create': [{}] * 1001}).status_code == 400
+
+
+def test_repeated_ids_build_on_each_other(client, project, make_task, make_subtask):
+    task_id = make_task(title='oldtitle')
+    subtask_id = make_subtask(task_id)
+
+    client.post('/bulk/tasks', json={'update': [
+        {'taskID': task_id, 'status': 'In Progress'},
+        {'taskID': task_id, 'status': 'Done'},
+        {'taskID': task_id, 'title': 'newtitle'},
+        {'taskID': task_id, 'description': 'details'}
+    ]})
+    client.post('/bulk/subtasks', json={'update': [
+        {'subtaskID': subtask_id, 'status': 'In Progress'},
+        {'subtaskID': subtask_id, 'status': 'Completed'}
+    ]})
+
+    stats = client.get(f'/project_stats/{project}').get_json()
+    assert stats['tasks']['byStatus'] == {'Done': 1}
+    assert stats['subtasks']['byStatus'] == {'Completed': 1}
+    assert 'negativeCounters' not in stats
+    found = client.get(f'/search?q=newtitle&userID=owner').get_json()['results']
+    assert [result['itemID'] for result in found] == [task_id]
+    assert client.get(f'/search?q=oldtitle&userID=owner').get_json()['results'] == []
+
+
+def test_failed_commit_reports_what_was_written(client, project, monkeypatch):
+    original = local_store.WriteBatch.commit
+    commits = []
+
+    def commit(batch):
+        commits.append(1)
+        if len(commits) == 2:
+            raise RuntimeError('unavailable')
+        return original(batch)
+
+    monkeypatch.setattr(local_store.WriteBatch, 'commit', commit)
+    response = client.post('/bulk/tasks', json={'create': [
+        {'title': f'task {index}', 'projectID': project} for index in range(300)
+    ]})
+    monkeypatch.setattr(local_store.WriteBatch, 'commit', original)
+
+    assert response.status_code == 500
+    body = response.get_json()
+    written = [result['taskID'] for result in body['results']['create'] if result['status'] == 'created']
+    assert 0 < len(written) < 300
+    assert body['failed'] == 300 - len(written)
+    assert all(result['error'] == 'Not written: unavailable'
+               for result in body['results']['create'] if result['status'] == 'error')
+    assert {doc.id for doc in db.collection('Tasks').stream()} == set(written)
+    assert client.get(f'/project_stats/{project}').get_json()['tasks']['total'] == len(written)
@@ -0,0 +1,103 @@
+import time
+from firebase_config import db
+from notifications import REMINDERS_COLLECTION
+from project_stats import STATS_COLLECTION
+from project_versions import VERSIONS_COLLECTION
+from search import SEARCH_COLLECTION, search_doc_id
+from sync import TOMBSTONES_COLLECTION
+
+
+def ids(collection, **filters):
+    query = db.collection(collection)
+    for field, value in filters.items():
+        query = query.where(field, '==', value)
+    return {doc.id for doc in query.stream()}
+
+
+def exists(collection, doc_id):
+    return db.collection(collection).document(doc_id).get().exists
+
+
+def test_task_cascade_removes_children_and_derived_documents(client, project, make_task, make_subtask):
+    task_id = make_task(dueDate='2999-01-01')
+    subtask_ids = {make_subtask(task_id, dueDate='2999-01-01') for _ in range(3)}
+    client.post('/add_comment', json={'taskID': task_id, 'userID': 'owner', 'message': 'hello'})
+    other_task = make_task()
+    other_subtask = make_subtask(other_task)
+
+    response = client.delete(f'/delete_task/{task_id}')
+
+    assert response.status_code == 200
+    job = response.get_json()['job']
+    assert (job['status'], job['queuedDeletes']) == ('done', 5)
+    assert not exists('Tasks', task_id)
+    assert ids('Subtasks', taskID=task_id) == set()
+    assert ids('Comments', taskID=task_id) == set()
+    assert ids('Subtasks') == {other_subtask}
+    for kind, item_id in [('task', task_id)] + [('subtask', subtask_id) for subtask_id in subtask_ids]:
+        assert not exists(SEARCH_COLLECTION, search_doc_id(kind, item_id))
+        assert exists(TOMBSTONES_COLLECTION, f'{kind}_{item_id}')
+        assert not ids(REMINDERS_COLLECTION, itemID=item_id)
+    assert exists(SEARCH_COLLECTION, search_doc_id('task', other_task))
+    assert client.delete(f'/delete_task/{task_id}').status_code == 404
+
+
+def test_task_cascade_spanning_several_commits_keeps_stats(client, project, make_task, make_subtask):
+    import cascade
+
+    task_id = make_task()
+    for _ in range(6):
+        make_subtask(task_id)
+    # Force a commit every few writes
+    original = cascade.BatchWriter
+    cascade.BatchWriter = lambda database: original(database, max_operations=cascade.ITEM_WRITES + 1)
+    try:
+        response = client.delete(f'/delete_task/{task_id}')
+    finally:
+        cascade.BatchWriter = original
+
+    assert response.get_json()['job']['committedWrites'] > cascade.ITEM_WRITES
+    stats = client.get(f'/project_stats/{project}').get_json()
+    assert (stats['tasks']['total'], stats['subtasks']['total']) == (0, 0)
+
+
+def test_project_cascade(client, project, make_user, make_task, make_subtask):
+    member = make_user('member')
+    assert client.put('/update_project', json={'projectID': project, 'members': ['owner', member]}).status_code == 200
+    assert project in db.collection('User').document(member).get().to_dict()['projects']
+    task_ids = [make_task() for _ in range(2)]
+    make_subtask(task_ids[0])
+
+    response = client.delete(f'/delete_project/{project}')
+
+    assert response.status_code == 200
+    assert not exists('Project', project)
+    assert ids('Tasks', projectID=project) == set()
+    assert ids('Subtasks', projectID=project) == set()
+    assert not exists(STATS_COLLECTION, project)
+    assert not exists(VERSIONS_COLLECTION, project)
+    assert exists(TOMBSTONES_COLLECTION, f'project_{project}')
+    assert not ids(REMINDERS_COLLECTION, itemID=project)
+    for user_id in ('owner', member):
+        assert project not in db.collection('User').document(user_id).get().to_dict()['projects']
+    assert client.get(f'/project_board/{project}').status_code == 404
+
+
+def test_background_delete_reports_through_delete_jobs(client, project, make_task, make_subtask):
+    task_id = make_task()
+    make_subtask(task_id)
+
+    response = client.delete(f'/delete_task/{task_id}?background=1')
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['jobID']
+
+    for _ in range(100):
+        job = client.get(f'/delete_jobs/{job_id}').get_json()
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.02)
+    assert job['status'] == 'done'
+    assert not exists('Tasks', task_id)
+    # Saved for the other workers too
+    assert db.collection('DeleteJobs').document(job_id).get().to_dict()['status'] == 'done'
+    assert client.get('/delete_jobs/unknown').status_code == 404
@@ -0,0 +1,60 @@
+def get(client, path, etag=None):
+    return client.get(path, headers={'If-None-Match': etag} if etag else {})
+
+
+def test_unchanged_project_answers_304(client, project, make_task):
+    make_task()
+    for path in (f'/get_tasks?projectID={project}', f'/project_board/{project}'):
+        first = get(client, path)
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+
+        again = get(client, path, etag)
+        assert again.status_code == 304
+        assert again.headers['ETag'] == etag
+        assert again.get_data() == b''
+
+
+def test_writes_change_the_etag(client, project, make_task, make_subtask):
+    task_id = make_task()
+    path = f'/project_board/{project}'
+    etag = get(client, path).headers['ETag']
+
+    make_subtask(task_id)
+    response = get(client, path, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    etag = response.headers['ETag']
+    client.put(f'/update_task/{task_id}', json={'status': 'Done'})
+    assert get(client, path, etag).status_code == 200
+
+
+def test_views_do_not_share_etags(client, project, make_task):
+    make_task()
+    etag = get(client, f'/get_tasks?projectID={project}').headers['ETag']
+    assert get(client, f'/get_tasks?projectID={project}&limit=1', etag).status_code == 200
+
+
+def test_deleted_project_answers_404_not_304(client, project, make_task):
+    make_task()
+    path = f'/project_board/{project}'
+    etag = get(client, path).headers['ETag']
+
+    assert client.delete(f'/delete_project/{project}').status_code == 200
+
+    response = get(client, path, etag)
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_project_without_version_document_is_never_304(client, project):
+    from firebase_config import db
+    from project_versions import VERSIONS_COLLECTION
+
+    # e.g. a project from before versioning that hasn't been written since
+    db.collection(VERSIONS_COLLECTION).document(project).delete()
+    response = get(client, f'/project_board/{project}')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert get(client, f'/project_board/{project}', '*').status_code == 200
@@ -0,0 +1,48 @@
+def pages(client, path):
+    items, cursor, count = [], None, 0
+    while True:
+        response = client.get(path + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        body = response.get_json()
+        items += body['tasks']
+        count += 1
+        cursor = body['nextCursor']
+        if not cursor:
+            return items, count
+
+
+def test_cursor_walks_every_task_once(client, project, make_task):
+    task_ids = {make_task(title=f'task {index}') for index in range(7)}
+
+    items, count = pages(client, f'/get_tasks?projectID={project}&limit=3')
+
+    assert count == 3
+    assert [item['taskID'] for item in items] == sorted(task_ids)
+    assert all('assignedUsername' in item for item in items)
+
+
+def test_exact_multiple_ends_without_cursor(client, project, make_task):
+    for _ in range(4):
+        make_task()
+    first = client.get(f'/get_tasks?projectID={project}&limit=2').get_json()
+    second = client.get(f'/get_tasks?projectID={project}&limit=2&cursor={first["nextCursor"]}').get_json()
+    assert len(second['tasks']) == 2
+    assert second['nextCursor'] is None
+
+
+def test_unpaginated_listing_has_no_cursor(client, project, make_task):
+    make_task()
+    body = client.get(f'/get_tasks?projectID={project}').get_json()
+    assert (len(body['tasks']), body['nextCursor']) == (1, None)
+
+
+def test_fields_projection_keeps_required_fields(client, project, make_task):
+    make_task(description='long text')
+    task = client.get(f'/get_tasks?projectID={project}&limit=5&fields=title').get_json()['tasks'][0]
+    assert {'taskID', 'assignedTo', 'title'} <= set(task)
+    assert 'description' not in task
+
+
+def test_invalid_arguments(client, project):
+    for query in ('limit=0', 'limit=abc', 'cursor=abc', 'limit=2&cursor=!!!', 'limit=2&cursor=e30'):
+        assert client.get(f'/get_tasks?projectID={project}&{query}').status_code == 400, query
@@ -0,0 +1,150 @@
+import random
+import threading
+import task
+from firebase_config import db
+from project_stats import COMMIT_ATTEMPTS, reconcile_project_stats
+
+
+def get_stats(client, project_id):
+    stats = client.get(f'/project_stats/{project_id}').get_json()
+    stats.pop('updatedAt', None)
+    return stats
+
+# The maintained stats must always equal a full recount
+def assert_consistent(client, project_id):
+    maintained = get_stats(client, project_id)
+    reconcile_project_stats()
+    assert maintained == get_stats(client, project_id)
+    assert 'negativeCounters' not in maintained
+
+
+# Runs a concurrent update_task for the same task just before the handler
+# under test commits. Returns the handler's commit attempts.
+def race_with_update(monkeypatch, client, task_id, every_attempt=False):
+    original = task.apply_stats
+    attempts = []
+    racing = []
+
+    def apply_stats(batch, project_id, changes):
+        if not racing:
+            attempts.append(1)
+            if every_attempt or len(attempts) == 1:
+                racing.append(1)
+                client.put(f'/update_task/{task_id}', json={'status': f'Raced {len(attempts)}'})
+                racing.pop()
+        return original(batch, project_id, changes)
+
+    monkeypatch.setattr(task, 'apply_stats', apply_stats)
+    return attempts
+
+
+def test_update_moves_counts(client, project, make_task):
+    task_id = make_task(status='To Do', priority='High')
+    make_task(status='To Do')
+
+    client.put(f'/update_task/{task_id}', json={'status': 'In Progress'})
+    client.put(f'/update_task/{task_id}', json={'status': 'Done', 'priority': 'Low'})
+
+    stats = get_stats(client, project)
+    assert stats['tasks']['total'] == 2
+    assert stats['tasks']['open'] == 1
+    assert stats['tasks']['byStatus'] == {'To Do': 1, 'Done': 1}
+    assert stats['tasks']['byPriority'] == {'Medium': 1, 'Low': 1}
+    assert_consistent(client, project)
+
+
+def test_delete_subtracts_task_and_subtasks(client, project, make_task, make_subtask):
+    task_id = make_task(dueDate='2020-01-01')
+    make_subtask(task_id)
+    make_subtask(task_id, status='Completed')
+    subtask_id = make_subtask(make_task())
+
+    assert client.delete(f'/delete_task/{task_id}').status_code == 200
+    assert client.delete(f'/delete_subtask/{subtask_id}').status_code == 200
+
+    stats = get_stats(client, project)
+    assert stats['tasks']['total'] == 1
+    assert stats['subtasks']['total'] == 0
+    assert stats['overdue'] == {'tasks': 0, 'subtasks': 0}
+    assert_consistent(client, project)
+
+
+def test_overdue_counts_open_items_due_before_today(client, project, make_task):
+    make_task(dueDate='2020-01-01')
+    make_task(dueDate='2020-01-01', status='Done')
+    make_task(dueDate='2999-01-01')
+
+    assert get_stats(client, project)['overdue'] == {'tasks': 1, 'subtasks': 0}
+
+
+def test_update_retries_after_concurrent_write(client, project, make_task, monkeypatch):
+    task_id = make_task()
+    attempts = race_with_update(monkeypatch, client, task_id)
+
+    response = client.put(f'/update_task/{task_id}', json={'priority': 'High'})
+
+    assert response.status_code == 200
+    assert len(attempts) == 2
+    assert response.get_json()['task']['status'] == 'Raced 1'
+    assert_consistent(client, project)
+
+
+def test_update_gives_up_with_409(client, project, make_task, monkeypatch):
+    task_id = make_task()
+    attempts = race_with_update(monkeypatch, client, task_id, every_attempt=True)
+
+    response = client.put(f'/update_task/{task_id}', json={'priority': 'High'})
+
+    assert response.status_code == 409
+    assert len(attempts) == COMMIT_ATTEMPTS
+    task_data = db.collection('Tasks').document(task_id).get().to_dict()
+    assert (task_data['status'], task_data['priority']) == (f'Raced {COMMIT_ATTEMPTS}', 'Medium')
+    assert_consistent(client, project)
+
+
+def test_delete_task_retries_after_concurrent_write(client, project, make_task, make_subtask, monkeypatch):
+    import cascade
+
+    task_id = make_task()
+    make_subtask(task_id)
+    original = cascade._delete_task_tree
+    calls = []
+
+    def racing(writer, job, target_id, project_id, task_doc=None):
+        calls.append(1)
+        if len(calls) == 1:
+            client.put(f'/update_task/{task_id}', json={'status': 'Done'})
+        return original(writer, job, target_id, project_id, task_doc)
+
+    monkeypatch.setattr(cascade, '_delete_task_tree', racing)
+
+    assert client.delete(f'/delete_task/{task_id}').status_code == 200
+    assert len(calls) == 2
+    assert get_stats(client, project)['tasks']['total'] == 0
+    assert_consistent(client, project)
+
+
+def test_parallel_updates_match_reconcile(client, project, make_task, make_subtask):
+    task_id = make_task(dueDate='2020-01-01')
+    subtask_id = make_subtask(task_id)
+    app = client.application
+    codes = []
+
+    def worker(seed):
+        worker_client = app.test_client()
+        rng = random.Random(seed)
+        for _ in range(15):
+            status = rng.choice(['To Do', 'In Progress', 'Done'])
+            codes.append(worker_client.put(f'/update_task/{task_id}', json={
+                'status': status, 'priority': rng.choice(['Low', 'High'])
+            }).status_code)
+            codes.append(worker_client.put(f'/update_subtask/{subtask_id}', json={'status': status}).status_code)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(codes) <= {200, 409}
+    assert_consistent(client, project)
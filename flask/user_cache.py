@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Process-local LRU + TTL cache of User documents shared by every blueprint
+class UserCache:
+    def __init__(self, max_size=1000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # userID -> (expiresAt, user_data)
+        self._emails = {}  # email -> userID for entries currently cached
+        self._listing = None  # (expiresAt, {userID: user_data}) for /users
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        with self._lock:
+            return self._get_locked(user_id)
+
+    # Return (found, missing) so callers only fetch what is not cached
+    def get_many(self, user_ids):
+        found = {}
+        missing = []
+        with self._lock:
+            for user_id in user_ids:
+                user_data = self._get_locked(user_id)
+                if user_data is None:
+                    missing.append(user_id)
+                else:
+                    found[user_id] = user_data
+        return found, missing
+
+    def get_by_email(self, email):
+        with self._lock:
+            user_id = self._emails.get(email)
+            if not user_id:
+                self.misses += 1
+                return None, None
+            user_data = self._get_locked(user_id)
+            return (user_id, user_data) if user_data is not None else (None, None)
+
+    def put(self, user_id, user_data):
+        with self._lock:
+            self._put_locked(user_id, user_data)
+            self._listing = None
+
+    def put_many(self, users):
+        with self._lock:
+            for user_id, user_data in users.items():
+                self._put_locked(user_id, user_data)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._remove_locked(user_id)
+            self._listing = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._emails.clear()
+            self._listing = None
+
+    # Full user directory, cached as a whole for /users
+    def get_listing(self):
+        with self._lock:
+            if self._listing and self._listing[0] > time.monotonic():
+                self.hits += 1
+                return self._listing[1]
+            self.misses += 1
+            self._listing = None
+            return None
+
+    def put_listing(self, users):
+        with self._lock:
+            for user_id, user_data in users.items():
+                self._put_locked(user_id, user_data)
+            self._listing = (time.monotonic() + self.ttl, users)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _get_locked(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user_data = entry
+        if expires_at <= time.monotonic():
+            self._remove_locked(user_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user_data
+
+    def _put_locked(self, user_id, user_data):
+        self._remove_locked(user_id)
+        self._entries[user_id] = (time.monotonic() + self.ttl, user_data)
+        if user_data.get('email'):
+            self._emails[user_data['email']] = user_id
+
+        while len(self._entries) > self.max_size:
+            oldest_id, (_, oldest_data) = self._entries.popitem(last=False)
+            self._drop_email_locked(oldest_id, oldest_data)
+            self.evictions += 1
+
+    def _remove_locked(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._drop_email_locked(user_id, entry[1])
+
+    def _drop_email_locked(self, user_id, user_data):
+        email = user_data.get('email')
+        if email and self._emails.get(email) == user_id:
+            del self._emails[email]
+
+
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '1000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '300'))
+)
@@ -0,0 +1,81 @@
+from firebase_config import db
+from storage import get_documents
+from user_cache import user_cache
+
+# Fetch the User documents for a set of IDs, serving what we can from the
+# process cache and reading the rest with as few round trips as possible
+def fetch_users(user_ids):
+    unique_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+    users, missing_ids = user_cache.get_many(unique_ids)
+
+    if missing_ids:
+        snapshots = get_documents(db.collection('User').document(user_id) for user_id in missing_ids)
+        fetched = {doc.id: doc.to_dict() for doc in snapshots.values() if doc.exists}
+        user_cache.put_many(fetched)
+        users.update(fetched)
+
+    return users
+
+def get_user(user_id):
+    if not user_id:
+        return None
+    return fetch_users([user_id]).get(user_id)
+
+# Attach assignedUsername/assignedAvatar to tasks or subtasks
+def attach_assignees(items, users=None):
+    if users is None:
+        users = fetch_users(item.get('assignedTo') for item in items)
+
+    for item in items:
+        assigned_user_id = item.get('assignedTo')
+        if assigned_user_id:
+            user_data = users.get(assigned_user_id)
+            if user_data:
+                item['assignedUsername'] = user_data.get('name', '')
+                item['assignedAvatar'] = user_data.get('avatar', '')
+            else:
+                item['assignedUsername'] = 'Unknown User'
+                item['assignedAvatar'] = ''
+        else:
+            item['assignedUsername'] = 'Unassigned'
+            item['assignedAvatar'] = ''
+
+    return items
+
+# Attach username/avatar of the author to each comment
+def attach_authors(comments, users=None):
+    if users is None:
+        users = fetch_users(comment.get('userID') for comment in comments)
+
+    for comment in comments:
+        user_id = comment.get('userID')
+        if user_id:
+            user_data = users.get(user_id)
+            if user_data:
+                comment['username'] = user_data.get('name', '')
+                comment['avatar'] = user_data.get('avatar', '')
+            else:
+                comment['username'] = 'Unknown User'
+                comment['avatar'] = ''
+        else:
+            comment['username'] = 'Anonymous'
+            comment['avatar'] = ''
+
+    return comments
+
+# Build the member profile list shown on a project, skipping unknown users
+def member_profiles(member_ids, users=None):
+    if users is None:
+        users = fetch_users(member_ids)
+
+    profiles = []
+    for member_id in member_ids:
+        user_data = users.get(member_id)
+        if user_data:
+            profiles.append({
+                'userID': member_id,
+                'name': user_data.get('name'),
+                'avatar': user_data.get('avatar')
+            })
+
+    return profiles
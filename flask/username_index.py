@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from firebase_config import db
+from storage import IN_QUERY_LIMIT
+
+def normalize_username(name):
+    return ' '.join(str(name).split()).casefold()
+
+# Users store their normalized name as 'nameKey' so the fallback query below
+# matches exactly what the index matches
+NAME_KEY_FIELD = 'nameKey'
+
+logger = logging.getLogger(__name__)
+
+# In-process name -> userID index used to resolve assignedUsername without a
+# query per edit. It is built on first use, kept current by signup and
+# rebuilt periodically to pick up users created by other workers. Periodic
+# rebuilds run on one background thread while requests keep using the
+# previous map.
+class UsernameIndex:
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._ids_by_name = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def build(self):
+        ids_by_name = {}
+        for doc in db.collection('User').select(['name']).stream():
+            name = doc.to_dict().get('name')
+            if name:
+                ids_by_name.setdefault(normalize_username(name), set()).add(doc.id)
+
+        with self._lock:
+            self._ids_by_name = ids_by_name
+            self._built_at = time.monotonic()
+
+    def add(self, user_id, name):
+        if not name:
+            return
+        with self._lock:
+            self._ids_by_name.setdefault(normalize_username(name), set()).add(user_id)
+
+    def remove(self, user_id, name):
+        if not name:
+            return
+        with self._lock:
+            user_ids = self._ids_by_name.get(normalize_username(name))
+            if user_ids:
+                user_ids.discard(user_id)
+                if not user_ids:
+                    del self._ids_by_name[normalize_username(name)]
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            # Nothing to serve yet, so the first requests wait for one build
+            with self._build_lock:
+                if self._built_at is None:
+                    self.build()
+        elif (time.monotonic() - self._built_at > self.refresh_interval and
+              self._build_lock.acquire(blocking=False)):
+            threading.Thread(target=self._rebuild, name='username-index', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Could not rebuild the username index')
+        finally:
+            self._build_lock.release()
+
+    # Return every userID registered under this name (more than one means
+    # the name is ambiguous)
+    def lookup(self, name):
+        self._ensure_fresh()
+
+        key = normalize_username(name)
+        with self._lock:
+            user_ids = set(self._ids_by_name.get(key, ()))
+
+        # Fall back to one query on a miss so recent signups on other
+        # workers still resolve before the next rebuild
+        if not user_ids:
+            for doc in db.collection('User').where(NAME_KEY_FIELD, '==', key).select(['name']).stream():
+                user_ids.add(doc.id)
+                self.add(doc.id, doc.to_dict().get('name'))
+
+        return sorted(user_ids)
+
+    # lookup() for many names at once: misses are resolved with batched 'in'
+    # queries instead of one query each. Returns {name: sorted userIDs}.
+    def lookup_many(self, names):
+        self._ensure_fresh()
+
+        keys = {name: normalize_username(name) for name in set(names)}
+        with self._lock:
+            found = {key: set(self._ids_by_name.get(key, ())) for key in set(keys.values())}
+
+        missing = sorted(key for key, user_ids in found.items() if not user_ids)
+        for start in range(0, len(missing), IN_QUERY_LIMIT):
+            chunk = missing[start:start + IN_QUERY_LIMIT]
+            query = db.collection('User').where(NAME_KEY_FIELD, 'in', chunk).select(['name', NAME_KEY_FIELD])
+            for doc in query.stream():
+                user_data = doc.to_dict()
+                found.setdefault(user_data.get(NAME_KEY_FIELD), set()).add(doc.id)
+                self.add(doc.id, user_data.get('name'))
+
+        return {name: sorted(found.get(key, ())) for name, key in keys.items()}
+
+
+username_index = UsernameIndex(
+    refresh_interval=float(os.getenv('USERNAME_INDEX_REFRESH', '300'))
+)
+
+# An assignedUsername that matches no user (404) or several (409)
+class AssigneeError(Exception):
+    def __init__(self, message, status, user_ids=None):
+        super().__init__(message)
+        self.status = status
+        self.user_ids = user_ids
+
+    def to_dict(self):
+        body = {'error': str(self)}
+        if self.user_ids:
+            body['userIDs'] = self.user_ids
+        return body
+
+# The single userID an assignedUsername names. user_ids is its lookup()
+# result when the caller already has it. Raises AssigneeError.
+def resolve_assignee(username, user_ids=None):
+    if user_ids is None:
+        user_ids = username_index.lookup(username)
+    if not user_ids:
+        raise AssigneeError('Assigned username not found', 404)
+    if len(user_ids) > 1:
+        raise AssigneeError(f'Username ({username}) matches more than one user', 409, user_ids)
+    return user_ids[0]